@@ -6,11 +6,19 @@ from views import admin, employee, client
 # Config page
 st.set_page_config(page_title="Cores & Fragrâncias", layout="wide", page_icon="🛍️")
 
-# Init DB
-db.init_db()
+# Init DB (migrações) e diretórios: uma vez por processo, não a cada rerun.
+# Se falhar, a exceção impede o cache_resource de guardar o resultado e o
+# próximo rerun tenta de novo.
+@st.cache_resource(show_spinner=False)
+def bootstrap():
+    db.init_db()
+    utils.ensure_directories()
+    version = db.get_schema_version()
+    if version != db.SCHEMA_VERSION:
+        raise RuntimeError(f"Banco na versão {version}, esperada {db.SCHEMA_VERSION}")
+    return version
 
-# Ensure directories
-utils.ensure_directories()
+bootstrap()
 
 # Apply CSS
 utils.apply_custom_css()
@@ -18,6 +26,9 @@ utils.apply_custom_css()
 # Session State for Auth
 if 'user' not in st.session_state:
     st.session_state['user'] = None
+elif st.session_state['user'] is not None and not isinstance(st.session_state['user'], db.SessionUser):
+    # Sessão aberta com o formato antigo (tupla SELECT *): pede login de novo
+    st.session_state['user'] = None
 
 def show_logo():
     try:
@@ -43,7 +54,8 @@ def login():
             submitted = st.form_submit_button("Entrar")
             
             if submitted:
-                user = db.check_login(username, password)
+                with st.spinner("Entrando..."):
+                    user = db.check_login(username, password)
                 if user:
                     st.session_state['user'] = user
                     st.rerun()
@@ -57,7 +69,7 @@ def main():
         login()
     else:
         user = st.session_state['user']
-        role = user[3]
+        role = user.role
         
         # Sidebar for Logout
         with st.sidebar:
@@ -68,21 +80,15 @@ def main():
             
             st.title("Menu")
             
-            # Profile Image Display
-            # Check if user tuple has the image column (index 9, since we added 5 cols to original 5)
-            # Original: id, user, pass, role, name (5)
-            # Added: birth, email, phone, cpf (4) -> total 9
-            # Added: profile_image (1) -> total 10. Index 9.
-            # Safety check on length
-            profile_img = None
-            if len(user) > 9 and user[9] is not None:
-                profile_img = user[9]
+            # Foto de perfil: carregada sob demanda (cache em database.get_user_avatar),
+            # não fica guardada na sessão
+            profile_img = utils.get_user_avatar(user.id)
             
             if profile_img:
-                st.image(profile_img, width=150, caption=user[4])
+                st.image(profile_img, width=150, caption=user.name)
             else:
                 # Placeholder or just text
-                st.write(f"Usuário: **{user[4]}**")
+                st.write(f"Usuário: **{user.name}**")
             
             st.write(f"Função: **{role.capitalize()}**")
             
@@ -90,10 +96,12 @@ def main():
                 new_profile_pic = st.file_uploader("Upload Foto", type=['png', 'jpg', 'jpeg'], key="profile_uploader")
                 if new_profile_pic:
                     if st.button("Salvar Foto"):
-                        img_bytes = new_profile_pic.read()
-                        updated_user = db.update_user_image(user[0], img_bytes)
-                        if updated_user:
-                            st.session_state['user'] = updated_user
+                        try:
+                            updated = utils.save_user_avatar(user.id, new_profile_pic.read())
+                        except Exception as e:
+                            print(f"Erro ao processar foto de perfil: {e}")
+                            updated = False
+                        if updated:
                             st.success("Foto atualizada!")
                             st.rerun()
                         else:
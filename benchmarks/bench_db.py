@@ -0,0 +1,188 @@
+"""
+Benchmark do banco: gera (ou reaproveita) um banco de rascunho com
+generate_data.py e mede as operações quentes do app, gravando um relatório
+JSON para comparar versões.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_db.py --output report.json
+    python benchmarks/bench_db.py --products 1000 --sales 50000 --clients 2000 --compare report.json
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+import utils
+import catalog_pdf
+from generate_data import generate
+
+REGRESSION_THRESHOLD = 1.25  # mais de 25% mais lento que o relatório anterior...
+REGRESSION_MIN_MS = 1.0      # ...e pelo menos 1 ms a mais (ignora ruído em operações rápidas)
+
+
+def _git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _rows(result):
+    if result is None or isinstance(result, (bytes, bytearray)):
+        return 0
+    if isinstance(result, dict):
+        return 1
+    if hasattr(result, "__len__"):
+        return len(result)
+    return 1
+
+
+def measure(name, fn, repeat=5, setup=None):
+    """Roda `fn` `repeat` vezes (com `setup` antes de cada uma, fora da medição)."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return {
+        'name': name,
+        'repeat': repeat,
+        'rows': _rows(result),
+        'bytes': len(result) if isinstance(result, (bytes, bytearray)) else None,
+        'min_ms': round(min(times) * 1000, 3),
+        'median_ms': round(statistics.median(times) * 1000, 3),
+        'mean_ms': round(statistics.mean(times) * 1000, 3),
+    }
+
+
+def _import_csv(rows, seed):
+    rng = random.Random(seed)
+    lines = ["nome;marca;estilo;tipo;preco;quantidade;data_validade"]
+    for i in range(rows):
+        lines.append(f"Importado {i};{rng.choice(utils.MARCAS)};{rng.choice(utils.ESTILOS)};{rng.choice(utils.TIPOS)};"
+                     f"{rng.uniform(5, 500):.2f};{rng.randrange(200)};31/12/2027")
+    return "\n".join(lines)
+
+
+def run_benchmarks(repeat=5, sales_ops=200, import_rows=10000, pdf=True, seed=42):
+    results = []
+    results.append(measure("get_products", db.get_products, repeat))
+    results.append(measure("get_sales_report", db.get_sales_report, repeat))
+    results.append(measure("get_birthday_clients (7 dias)", lambda: db.get_birthday_clients(days=7), repeat))
+    results.append(measure("get_dashboard_summary", db.get_dashboard_summary, repeat))
+
+    # Escritas: vendas de 1 unidade em produtos com estoque
+    with db.pooled_connection() as conn:
+        in_stock = [row[0] for row in conn.execute("SELECT id FROM products WHERE quantity > 10 LIMIT 1000")]
+    rng = random.Random(seed)
+
+    def sell_many():
+        ok = 0
+        for _ in range(sales_ops):
+            ok += db.register_sale(rng.choice(in_stock), 1)[0]
+        return [None] * ok
+
+    if in_stock:
+        sale = measure(f"register_sale x{sales_ops}", sell_many, 1)
+        sale['per_op_ms'] = round(sale['median_ms'] / sales_ops, 3)
+        results.append(sale)
+
+    csv_text = _import_csv(import_rows, seed)
+    allowed_values = {'marca': utils.MARCAS, 'estilo': utils.ESTILOS, 'tipo': utils.TIPOS}
+    results.append(measure(f"import_products_csv ({import_rows} linhas)",
+                           lambda: [None] * db.import_products_csv(io.StringIO(csv_text), allowed_values)['imported'], 1))
+
+    if pdf:
+        products = db.count_products()
+        results.append(measure(f"generate_catalog_pdf ({products} produtos)", catalog_pdf.generate_catalog_pdf, 1))
+    return results
+
+
+def compare(results, previous_path):
+    """Imprime a variação em relação a um relatório anterior; retorna as operações que pioraram."""
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {r['name']: r for r in json.load(f)['results']}
+    regressions = []
+    print(f"\nComparação com {previous_path}:")
+    for r in results:
+        old = previous.get(r['name'])
+        if not old or not old['median_ms']:
+            continue
+        ratio = r['median_ms'] / old['median_ms']
+        slower = ratio > REGRESSION_THRESHOLD and r['median_ms'] - old['median_ms'] > REGRESSION_MIN_MS
+        flag = "  <-- REGRESSÃO" if slower else ""
+        print(f"  {r['name']:<45} {old['median_ms']:>10.2f} -> {r['median_ms']:>10.2f} ms ({ratio:.2f}x){flag}")
+        if flag:
+            regressions.append(r['name'])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="banco já gerado (cópia de rascunho); sem isso gera um temporário")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--sales", type=int, default=1000000)
+    parser.add_argument("--clients", type=int, default=50000)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sales-ops", type=int, default=200, help="vendas registradas no teste de escrita")
+    parser.add_argument("--import-rows", type=int, default=10000)
+    parser.add_argument("--no-pdf", action="store_true", help="pula o catálogo em PDF")
+    parser.add_argument("--output", help="grava o relatório JSON neste arquivo")
+    parser.add_argument("--compare", help="relatório JSON anterior para comparar")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            db.DB_NAME = args.db
+            db.init_db()
+            dataset = {'db': args.db}
+        else:
+            dataset = generate(os.path.join(tmp, "bench.db"), args.products, args.sales, args.clients,
+                               args.images, args.seed, progress=lambda msg: print(msg, file=sys.stderr))
+        results = run_benchmarks(args.repeat, args.sales_ops, args.import_rows, not args.no_pdf, args.seed)
+        db.close_all_connections()
+
+    report = {
+        'created_at': datetime.datetime.now().isoformat(timespec="seconds"),
+        'version': _git_version(),
+        'schema_version': db.SCHEMA_VERSION,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'dataset': dataset,
+        'results': results,
+    }
+
+    for r in results:
+        print(f"{r['name']:<45} {r['median_ms']:>10.2f} ms  ({r['rows']} linhas)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nRelatório gravado em {args.output}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.compare and compare(results, args.compare):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
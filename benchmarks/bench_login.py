@@ -0,0 +1,104 @@
+"""
+Benchmark de login: várias sessões fazendo login ao mesmo tempo (troca de
+turno), medindo logins/segundo e latência para cada tamanho do pool de senhas.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_login.py --rounds 12 --workers 1,2,4,8 --sessions 12
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def setup_users(db_path, sessions, rounds):
+    db.DB_NAME = db_path
+    db.configure_password_hashing(rounds=rounds)
+    db.init_db()
+    for i in range(sessions):
+        db.create_user(f"func{i}", f"senha{i}", "funcionario", f"Funcionário {i}")
+
+
+def run_logins(sessions, logins_per_session):
+    """Dispara `sessions` threads (uma por sessão) e retorna (segundos, latências, falhas)."""
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(sessions)
+
+    def session(i):
+        barrier.wait()
+        for _ in range(logins_per_session):
+            start = time.perf_counter()
+            user = db.check_login(f"func{i}", f"senha{i}")
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if user is None:
+                    failures.append(i)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, latencies, len(failures)
+
+
+def run(rounds=12, workers=(1, 2, 4, 8), sessions=12, logins_per_session=2):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_users(os.path.join(tmp, "bench.db"), sessions, rounds)
+        for n in workers:
+            db.configure_password_hashing(workers=n)
+            elapsed, latencies, failures = run_logins(sessions, logins_per_session)
+            results.append({
+                'rounds': rounds,
+                'workers': n,
+                'sessions': sessions,
+                'logins': len(latencies),
+                'failures': failures,
+                'seconds': round(elapsed, 3),
+                'logins_per_second': round(len(latencies) / elapsed, 2),
+                'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+                'p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+            })
+        db.close_all_connections()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=db.BCRYPT_ROUNDS, help="custo do bcrypt")
+    parser.add_argument("--workers", default="1,2,4,8", help="tamanhos do pool, separados por vírgula")
+    parser.add_argument("--sessions", type=int, default=12, help="sessões fazendo login ao mesmo tempo")
+    parser.add_argument("--logins", type=int, default=2, help="logins por sessão")
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    workers = [int(w) for w in args.workers.split(",") if w.strip()]
+    results = run(args.rounds, workers, args.sessions, args.logins)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"bcrypt custo {args.rounds}, {args.sessions} sessões x {args.logins} logins (CPUs: {os.cpu_count()})")
+    print(f"{'pool':>5} {'logins/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'falhas':>7}")
+    for r in results:
+        print(f"{r['workers']:>5} {r['logins_per_second']:>10} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['failures']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark do catálogo em PDF: gera um banco de rascunho com N produtos
+(generate_data.py) e mede catalog_pdf.generate_catalog_pdf em páginas por
+segundo e pico de memória.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_pdf.py --products 50000 --images 500
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+import catalog_pdf
+from generate_data import generate
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except Exception:
+        return None
+
+
+def run(products=5000, images=200, with_images=True, seed=42):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Mensagens da geração vão para stderr, para não misturar com o --json
+        with contextlib.redirect_stdout(sys.stderr):
+            generate(os.path.join(tmp, "bench.db"), products=products, sales=0, clients=0, images=images,
+                     seed=seed, progress=lambda msg: print(msg, file=sys.stderr))
+        rss_before = _peak_rss_mb()
+        path = os.path.join(tmp, "catalogo.pdf")
+        start = time.perf_counter()
+        pages = catalog_pdf.generate_catalog_pdf(path, with_images=with_images)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        db.close_all_connections()
+
+    return {
+        'products': products,
+        'images': images if with_images else 0,
+        'pages': pages,
+        'seconds': round(elapsed, 2),
+        'pages_per_second': round(pages / elapsed, 1),
+        'products_per_second': round(products / elapsed, 1),
+        'pdf_mb': round(size / (1024 * 1024), 2),
+        'peak_rss_mb_before': rss_before,
+        'peak_rss_mb_after': _peak_rss_mb(),
+        'unicode_font': catalog_pdf.find_unicode_font()[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--images", type=int, default=200, help="imagens distintas no banco")
+    parser.add_argument("--no-images", action="store_true", help="gera o catálogo sem miniaturas")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    result = run(args.products, args.images, not args.no_images, args.seed)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['products']} produtos, {result['images']} imagens distintas -> {result['pages']} páginas "
+          f"em {result['seconds']} s ({result['pages_per_second']} páginas/s, {result['pdf_mb']} MB)")
+    print(f"pico de memória: {result['peak_rss_mb_before']} MB antes, {result['peak_rss_mb_after']} MB depois")
+
+
+if __name__ == "__main__":
+    main()
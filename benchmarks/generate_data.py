@@ -0,0 +1,172 @@
+"""
+Gerador de dados sintéticos (com semente) para benchmarks: preenche um
+store.db de rascunho com produtos, imagens, clientes, funcionários e vendas
+em volumes realistas.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/generate_data.py --db /tmp/bench.db --products 10000 --sales 1000000 --clients 50000
+"""
+import argparse
+import datetime
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+import utils
+
+CHUNK_SIZE = 50000
+IMAGE_RATIO = 0.6  # fração dos produtos com imagem
+EMPLOYEES = 10
+
+_ADJECTIVES = ["Intenso", "Suave", "Floral", "Amadeirado", "Cítrico", "Noturno", "Fresh", "Clássico",
+               "Essencial", "Radiante", "Glow", "Nutritivo", "Hidratante", "Matte", "Gold", "Sport"]
+_FIRST_NAMES = ["Ana", "Beatriz", "Carla", "Daniela", "Eduarda", "Fernanda", "Gabriela", "Helena", "Isabela",
+                "Júlia", "Larissa", "Mariana", "Natália", "Patrícia", "Renata", "Sofia", "João", "Pedro",
+                "Lucas", "Rafael", "Marcos", "Bruno", "Thiago", "André"]
+_LAST_NAMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Rodrigues", "Almeida",
+               "Nascimento", "Araújo", "Ribeiro", "Carvalho", "Gomes", "Martins", "Barbosa"]
+
+
+def _random_date(rng, start, end):
+    return start + datetime.timedelta(days=rng.randrange((end - start).days + 1))
+
+
+def _make_image(rng, side=256):
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (side, side), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(6):
+        x0, y0 = rng.randrange(side), rng.randrange(side)
+        x1, y1 = x0 + rng.randrange(20, side // 2), y0 + rng.randrange(20, side // 2)
+        draw.ellipse((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _insert_chunks(conn, sql, rows_iter, total, label, progress):
+    done = 0
+    chunk = []
+    for row in rows_iter:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            conn.executemany(sql, chunk)
+            conn.commit()
+            done += len(chunk)
+            chunk = []
+            progress(f"{label}: {done}/{total}")
+    if chunk:
+        conn.executemany(sql, chunk)
+        conn.commit()
+        done += len(chunk)
+    progress(f"{label}: {done}/{total}")
+
+
+def generate(db_path, products=10000, sales=1000000, clients=50000, images=200, seed=42, progress=print):
+    """
+    Cria (ou completa) o banco em `db_path` e retorna um resumo do que foi
+    gerado. A mesma semente gera sempre os mesmos dados.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    db.DB_NAME = db_path
+    db.configure_password_hashing(rounds=4)  # só para gerar rápido; o custo real não importa aqui
+    db.init_db()
+    today = datetime.date.today()
+
+    with db.pooled_connection() as conn:
+        # Imagens: poucas distintas, compartilhadas entre produtos (como fotos de linha)
+        image_hashes = []
+        if images:
+            conn.execute("BEGIN IMMEDIATE")
+            for _ in range(images):
+                image_hashes.append(db._store_image(conn.cursor(), _make_image(rng)))
+            conn.commit()
+            progress(f"imagens: {len(image_hashes)}")
+
+        first_product = (conn.execute("SELECT COALESCE(MAX(id), 0) FROM products").fetchone()[0]) + 1
+
+        def product_rows():
+            for i in range(products):
+                tipo = rng.choice(utils.TIPOS)
+                expiration = None
+                if rng.random() < 0.8:
+                    expiration = _random_date(rng, today - datetime.timedelta(days=60),
+                                              today + datetime.timedelta(days=1095)).strftime(db.DATE_FORMAT)
+                image_hash = rng.choice(image_hashes) if image_hashes and rng.random() < IMAGE_RATIO else None
+                yield (f"{tipo} {rng.choice(_ADJECTIVES)} {first_product + i}", rng.choice(utils.MARCAS),
+                       rng.choice(utils.ESTILOS), tipo, round(rng.uniform(5, 500), 2), rng.randrange(0, 201),
+                       expiration, image_hash, f"789{first_product + i:010d}")
+
+        _insert_chunks(conn, '''INSERT INTO products (name, brand, style, type, price, quantity, expiration_date, image_hash, sku)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                       product_rows(), products, "produtos", progress)
+
+        # Uma senha (hash) para todos: gerar 50k hashes bcrypt não é o que se quer medir
+        password = db.hash_password("senha123")
+        first_user = (conn.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0]) + 1
+
+        def user_rows():
+            for i in range(EMPLOYEES + clients):
+                uid = first_user + i
+                name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+                if i < EMPLOYEES:
+                    yield (f"funcionario{uid}", password, "funcionario", name, None, None, None, None)
+                    continue
+                birth = _random_date(rng, datetime.date(1950, 1, 1), datetime.date(2008, 12, 31))
+                yield (f"cliente{uid}", password, "cliente", name, birth.strftime(db.DATE_FORMAT),
+                       f"cliente{uid}@exemplo.com", f"(11) 9{rng.randrange(10**8):08d}",
+                       f"{rng.randrange(10**11):011d}")
+
+        _insert_chunks(conn, '''INSERT INTO users (username, password, role, name, birth_date, email, phone, cpf)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                       user_rows(), EMPLOYEES + clients, "usuários", progress)
+
+        product_prices = conn.execute("SELECT id, price FROM products").fetchall()
+        sellers = [row[0] for row in conn.execute("SELECT id FROM users WHERE role IN ('admin', 'funcionario')")]
+        first_sale = datetime.datetime.combine(today - datetime.timedelta(days=730), datetime.time(9))
+
+        def sale_rows():
+            for _ in range(sales):
+                product_id, price = rng.choice(product_prices)
+                quantity = rng.randrange(1, 6)
+                sale_date = first_sale + datetime.timedelta(seconds=rng.randrange(730 * 86400))
+                yield (product_id, quantity, round(price * quantity, 2),
+                       sale_date.strftime("%Y-%m-%d %H:%M:%S"), rng.choice(sellers))
+
+        if sales and product_prices:
+            _insert_chunks(conn, '''INSERT INTO sales (product_id, quantity, total_value, sale_date, user_id)
+                                    VALUES (?, ?, ?, ?, ?)''',
+                           sale_rows(), sales, "vendas", progress)
+        conn.execute("ANALYZE")
+
+    return {
+        'db': db_path, 'seed': seed, 'products': products, 'sales': sales, 'clients': clients,
+        'employees': EMPLOYEES, 'images': len(image_hashes),
+        'seconds': round(time.perf_counter() - start, 2),
+        'db_bytes': os.path.getsize(db_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="arquivo do banco de rascunho (nunca o store.db real)")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--sales", type=int, default=1000000)
+    parser.add_argument("--clients", type=int, default=50000)
+    parser.add_argument("--images", type=int, default=200, help="imagens distintas geradas")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    summary = generate(args.db, args.products, args.sales, args.clients, args.images, args.seed)
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
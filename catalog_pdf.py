@@ -0,0 +1,297 @@
+import os
+import math
+import datetime
+from pathlib import Path
+import fpdf
+from fpdf import FPDF
+import database as db
+import utils
+
+# Catálogo de produtos em PDF
+# Os produtos vêm do banco em blocos (database.catalog_report_cursor), já
+# ordenados por marca e estilo, e são desenhados um a um: nada de DataFrame
+# com o catálogo inteiro. Cada produto leva a miniatura JPEG (em cache no
+# disco e incluída uma única vez no PDF por imagem distinta) e o sumário com
+# links é escrito no fim, nas páginas reservadas no começo.
+#
+# Limite: a PyFPDF 1.7 guarda o conteúdo das páginas em memória até gravar o
+# arquivo, então a memória cresce com o número de páginas (alguns KB cada)
+# e de imagens distintas, não com os dados lidos do banco.
+
+FONT_CACHE_DIR = Path("cache") / "fonts"
+FONT_CANDIDATES = [
+    os.environ.get("PDF_FONT_PATH"),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+# Variante negrito procurada ao lado da fonte normal
+BOLD_SUFFIXES = {"DejaVuSans.ttf": "DejaVuSans-Bold.ttf", "arial.ttf": "arialbd.ttf"}
+
+THUMBNAIL_SIZE = 'small'
+ROW_HEIGHT = 16       # mm por produto
+IMAGE_SIDE = 13       # mm
+TOC_LINE_HEIGHT = 6   # mm
+COLOR_TITLE = (128, 0, 32)    # utils.COLOR_TEXT_LARGE_1
+COLOR_TEXT = (54, 69, 79)     # utils.COLOR_TEXT_SMALL
+COLOR_BAND = (255, 250, 205)
+
+def find_unicode_font():
+    """Caminho de uma fonte TrueType com Unicode (regular, negrito ou None), ou (None, None)."""
+    for path in FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            bold = os.path.join(os.path.dirname(path), BOLD_SUFFIXES.get(os.path.basename(path), ""))
+            return path, bold if os.path.isfile(bold) else None
+    return None, None
+
+class CatalogPDF(FPDF):
+    def __init__(self, title):
+        super().__init__(orientation='P', unit='mm', format='A4')
+        self.title_text = title
+        self.generated_at = datetime.datetime.now().strftime("%d/%m/%Y %H:%M")
+        self.unicode = False
+        self.font_name = "Arial"
+        self.set_auto_page_break(True, margin=15)
+        self.set_margins(12, 12, 12)
+        self.alias_nb_pages()
+
+        regular, bold = find_unicode_font()
+        if regular:
+            try:
+                FONT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                fpdf.set_global("FPDF_CACHE_MODE", 2)
+                fpdf.set_global("FPDF_CACHE_DIR", str(FONT_CACHE_DIR))
+                self.add_font("Catalogo", "", regular, uni=True)
+                self.add_font("Catalogo", "B", bold or regular, uni=True)
+                self.font_name = "Catalogo"
+                self.unicode = True
+            except Exception as e:
+                print(f"Fonte Unicode indisponível, usando Arial (latin-1): {e}")
+
+    def text_of(self, value):
+        text = "" if value is None else str(value)
+        if self.unicode:
+            return text
+        return text.encode('latin-1', 'replace').decode('latin-1')
+
+    def fit(self, value, width):
+        """Corta o texto (com reticências) para caber em `width` mm na fonte atual."""
+        text = self.text_of(value)
+        if self.get_string_width(text) <= width:
+            return text
+        ellipsis = "…" if self.unicode else "..."
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.get_string_width(text[:mid] + ellipsis) <= width:
+                low = mid
+            else:
+                high = mid - 1
+        return text[:low].rstrip() + ellipsis
+
+    def header(self):
+        self.set_font(self.font_name, "B", 9)
+        self.set_text_color(*COLOR_TITLE)
+        self.cell(0, 6, self.text_of(self.title_text), 0, 0, 'L')
+        self.set_font(self.font_name, "", 8)
+        self.set_text_color(*COLOR_TEXT)
+        self.cell(0, 6, self.text_of(f"Gerado em {self.generated_at}"), 0, 1, 'R')
+        self.set_draw_color(*COLOR_TITLE)
+        self.line(self.l_margin, self.get_y(), self.w - self.r_margin, self.get_y())
+        self.ln(3)
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font(self.font_name, "", 8)
+        self.set_text_color(*COLOR_TEXT)
+        self.cell(0, 6, self.text_of(f"Página {self.page_no()} de {{nb}}"), 0, 0, 'C')
+
+    def ensure_space(self, height):
+        if self.get_y() + height > self.page_break_trigger:
+            self.add_page()
+
+def _money(value):
+    try:
+        return f"R$ {float(value):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    except (TypeError, ValueError):
+        return "-"
+
+def _product_thumbnail(item, memo):
+    # Miniatura JPEG (a PyFPDF 1.7 não lê WebP) pelo hash da imagem original
+    image_hash = item.get('image_hash')
+    if not image_hash:
+        return None
+    if image_hash not in memo:
+        from PIL import Image
+        
+        thumb = utils.thumbnail_path(image_hash, THUMBNAIL_SIZE, fmt="JPEG")
+        try:
+            if not thumb.exists():
+                with open(item['image_path'], "rb") as f:
+                    thumb = utils.make_thumbnail(f.read(), THUMBNAIL_SIZE, fmt="JPEG", digest=image_hash)
+            with Image.open(thumb) as img:
+                width, height = img.size
+            memo[image_hash] = (str(thumb), width, height)
+        except Exception as e:
+            print(f"Erro ao gerar miniatura do PDF: {e}")
+            memo[image_hash] = None
+    return memo[image_hash]
+
+def _toc_pages_needed(pdf, groups):
+    lines = len({brand for brand, _, _ in groups}) + len(groups)
+    first_page = (pdf.page_break_trigger - pdf.t_margin - 30) / TOC_LINE_HEIGHT
+    other_pages = (pdf.page_break_trigger - pdf.t_margin - 10) / TOC_LINE_HEIGHT
+    if lines <= first_page:
+        return 1
+    return 1 + math.ceil((lines - first_page) / other_pages)
+
+def _draw_brand(pdf, brand, count):
+    pdf.ensure_space(10 + 7 + ROW_HEIGHT)
+    pdf.ln(2)
+    pdf.set_fill_color(*COLOR_TITLE)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font(pdf.font_name, "B", 12)
+    pdf.cell(0, 8, pdf.text_of(f"  {brand or 'Sem marca'}  ({count} produtos)"), 0, 1, 'L', True)
+    pdf.ln(1)
+
+def _draw_style(pdf, style, count):
+    pdf.ensure_space(7 + ROW_HEIGHT)
+    pdf.set_text_color(*COLOR_TITLE)
+    pdf.set_font(pdf.font_name, "B", 10)
+    pdf.cell(0, 7, pdf.text_of(f"{style or 'Sem estilo'} ({count})"), "B", 1, 'L')
+    pdf.ln(1)
+
+def _draw_product(pdf, item, thumbnail, shade):
+    pdf.ensure_space(ROW_HEIGHT)
+    x, y = pdf.l_margin, pdf.get_y()
+    width = pdf.w - pdf.l_margin - pdf.r_margin
+    if shade:
+        pdf.set_fill_color(*COLOR_BAND)
+        pdf.rect(x, y, width, ROW_HEIGHT - 1, 'F')
+
+    if thumbnail:
+        # Cabe no quadrado de IMAGE_SIDE mantendo a proporção
+        thumb_path, thumb_w, thumb_h = thumbnail
+        scale = IMAGE_SIDE / max(thumb_w, thumb_h)
+        w, h = thumb_w * scale, thumb_h * scale
+        try:
+            pdf.image(thumb_path, x + 1 + (IMAGE_SIDE - w) / 2, y + 1 + (IMAGE_SIDE - h) / 2, w, h)
+        except Exception as e:
+            print(f"Erro ao incluir imagem no PDF: {e}")
+
+    text_x = x + IMAGE_SIDE + 4
+    right_width = 52
+    text_width = width - (text_x - x) - right_width
+
+    pdf.set_text_color(*COLOR_TEXT)
+    pdf.set_font(pdf.font_name, "B", 9)
+    pdf.set_xy(text_x, y + 1.5)
+    pdf.cell(text_width, 5, pdf.fit(item['name'], text_width - 1), 0, 0, 'L')
+    pdf.set_font(pdf.font_name, "B", 10)
+    pdf.cell(right_width, 5, pdf.text_of(_money(item['price'])), 0, 0, 'R')
+
+    details = [item['type'] or "", f"Cód. {item['sku']}" if item['sku'] else "", f"ID {item['id']}"]
+    pdf.set_font(pdf.font_name, "", 8)
+    pdf.set_xy(text_x, y + 7.5)
+    pdf.cell(text_width, 5, pdf.fit(" | ".join(d for d in details if d), text_width - 1), 0, 0, 'L')
+    stock = f"Estoque: {item['quantity']}"
+    if item['expiration_date']:
+        stock += f"  Val: {item['expiration_date']}"
+    pdf.cell(right_width, 5, pdf.fit(stock, right_width), 0, 0, 'R')
+    pdf.set_xy(x, y + ROW_HEIGHT)
+
+def _write_toc(pdf, toc_pages, entries):
+    # Volta às páginas reservadas no início; a quebra automática fica desligada
+    # para o sumário nunca criar páginas novas no fim do documento
+    last_page = pdf.page
+    pdf.set_auto_page_break(False)
+    pages = iter(toc_pages)
+
+    def start_page(first):
+        pdf.page = next(pages)
+        pdf.font_family = ''  # força a fonte a ser redefinida nesta página
+        pdf.set_xy(pdf.l_margin, pdf.t_margin + 10)
+        if first:
+            pdf.set_font(pdf.font_name, "B", 18)
+            pdf.set_text_color(*COLOR_TITLE)
+            pdf.cell(0, 12, pdf.text_of("Sumário"), 0, 1, 'L')
+            pdf.ln(4)
+
+    start_page(True)
+    width = pdf.w - pdf.l_margin - pdf.r_margin
+    for level, label, page, link in entries:
+        if pdf.get_y() + TOC_LINE_HEIGHT > pdf.page_break_trigger:
+            try:
+                start_page(False)
+            except StopIteration:
+                break
+        indent = 0 if level == 0 else 8
+        pdf.set_font(pdf.font_name, "B" if level == 0 else "", 10 if level == 0 else 9)
+        pdf.set_text_color(*(COLOR_TITLE if level == 0 else COLOR_TEXT))
+        pdf.set_x(pdf.l_margin + indent)
+        pdf.cell(width - indent - 15, TOC_LINE_HEIGHT, pdf.fit(label, width - indent - 18), 0, 0, 'L', link=link)
+        pdf.cell(15, TOC_LINE_HEIGHT, str(page), 0, 1, 'R', link=link)
+
+    pdf.page = last_page
+    pdf.font_family = ''
+
+def generate_catalog_pdf(path=None, progress=None, with_images=True, chunk_size=db.REPORT_CHUNK_SIZE,
+                         title="Cores & Fragrâncias - Catálogo de Produtos"):
+    """
+    Gera o catálogo em PDF. Grava em `path` (e retorna o número de páginas) ou,
+    sem `path`, retorna os bytes. `progress(fração)` é chamado a cada bloco.
+    """
+    pdf = CatalogPDF(title)
+    pdf.set_title(pdf.text_of(title))
+    thumbnails = {}
+    toc = []
+
+    with db.catalog_report_cursor(chunk_size) as (groups, rows):
+        total = sum(count for _, _, count in groups)
+        brand_counts = {}
+        for brand, _, count in groups:
+            brand_counts[brand] = brand_counts.get(brand, 0) + count
+        style_counts = {(brand, style): count for brand, style, count in groups}
+
+        toc_pages = []
+        for _ in range(_toc_pages_needed(pdf, groups)):
+            pdf.add_page()
+            toc_pages.append(pdf.page)
+        pdf.add_page()
+
+        current_brand = current_style = None
+        shade = False
+        for done, item in enumerate(rows, 1):
+            brand, style = item['brand'] or '', item['style'] or ''
+            if brand != current_brand:
+                _draw_brand(pdf, brand, brand_counts.get(brand, 0))
+                link = pdf.add_link()
+                pdf.set_link(link, y=pdf.get_y() - 11, page=pdf.page)
+                toc.append((0, brand or 'Sem marca', pdf.page, link))
+                current_brand, current_style = brand, None
+            if style != current_style:
+                _draw_style(pdf, style, style_counts.get((brand, style), 0))
+                link = pdf.add_link()
+                pdf.set_link(link, y=pdf.get_y() - 8, page=pdf.page)
+                toc.append((1, style or 'Sem estilo', pdf.page, link))
+                current_style = style
+                shade = False
+
+            thumbnail = _product_thumbnail(item, thumbnails) if with_images else None
+            _draw_product(pdf, item, thumbnail, shade)
+            shade = not shade
+            if progress and (done % chunk_size == 0 or done == total):
+                progress(done / max(total, 1))
+
+        if total == 0:
+            pdf.set_font(pdf.font_name, "", 11)
+            pdf.cell(0, 10, pdf.text_of("Nenhum produto cadastrado."), 0, 1, 'C')
+
+    _write_toc(pdf, toc_pages, toc)
+    if path:
+        pdf.output(str(path), 'F')
+        return pdf.page
+    output = pdf.output(dest='S')
+    return output.encode('latin-1') if isinstance(output, str) else bytes(output)
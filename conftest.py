@@ -0,0 +1,28 @@
+import sqlite3
+
+import pytest
+
+import database as db
+
+
+@pytest.fixture
+def scratch_db(tmp_path, monkeypatch):
+    # Banco descartável e já migrado; o store.db real não é tocado
+    path = tmp_path / "store.db"
+    monkeypatch.setattr(db, "DB_NAME", str(path))
+    db.init_db()
+    yield path
+    db.close_all_connections()
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    # Banco só com o esquema original (user_version 0), ainda sem migrações
+    path = tmp_path / "store.db"
+    conn = sqlite3.connect(str(path))
+    db._migration_base_schema(conn.cursor())
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(db, "DB_NAME", str(path))
+    yield path
+    db.close_all_connections()
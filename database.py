@@ -1,276 +1,1533 @@
 import sqlite3
+import os
+import time
+import sys
+import re
+import hashlib
+import json
+import threading
+import queue
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import bcrypt
+import perf
+import calendar
 import datetime
 
 DB_NAME = "store.db"
 
-def init_db():
+# Pool de conexões
+# Cada thread empresta uma conexão do pool enquanto executa uma operação e a
+# devolve ao final; chamadas aninhadas na mesma thread reutilizam a mesma conexão.
+POOL_SIZE = 8
+BUSY_TIMEOUT = 10  # segundos esperando um lock antes de desistir
+STATEMENT_CACHE_SIZE = 256  # statements preparados mantidos por conexão
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # leitores não bloqueiam escritores
+    "PRAGMA synchronous=NORMAL",    # seguro com WAL e bem mais rápido que FULL
+    "PRAGMA cache_size=-16000",     # ~16 MB de cache de páginas por conexão
+    "PRAGMA mmap_size=268435456",   # 256 MB mapeados em memória
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA recursive_triggers=ON", # INSERT OR REPLACE dispara os triggers de DELETE
+)
+
+_pools = {}
+_pools_lock = threading.Lock()
+_local = threading.local()
+
+def _open_connection():
+    # TracedConnection mede o SQL de cada chamada instrumentada (perf.py)
+    factory = perf.TracedConnection if perf.PERF_ENABLED else sqlite3.Connection
+    conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE, factory=factory)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _get_pool():
+    with _pools_lock:
+        pool = _pools.get(DB_NAME)
+        if pool is None:
+            pool = _pools[DB_NAME] = queue.LifoQueue(maxsize=POOL_SIZE)
+        return pool
+
+@contextmanager
+def pooled_connection():
+    """
+    Empresta uma conexão do pool para a thread atual.
+    Em caso de exceção a transação aberta é desfeita; a conexão volta ao pool
+    (ou é fechada se o pool estiver cheio).
+    """
+    held = getattr(_local, 'held', None)
+    if held is not None and held[0] == DB_NAME:
+        # Chamada aninhada: reutiliza a conexão já emprestada
+        yield held[1]
+        return
+
+    pool = _get_pool()
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
-        # Tabela de Usuários
-        c.execute('''CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT UNIQUE NOT NULL,
-                        password TEXT NOT NULL,
-                        role TEXT NOT NULL,
-                        name TEXT
-                    )''')
-        
-        # Migração: Adicionar colunas novas se não existirem
-        cols_to_add = [
-            ("birth_date", "TEXT"),
-            ("email", "TEXT"),
-            ("phone", "TEXT"),
-            ("cpf", "TEXT"),
-            ("profile_image", "BLOB")
-        ]
-        
-        for col_name, col_type in cols_to_add:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+
+    _local.held = (DB_NAME, conn)
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _local.held = None
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+def close_all_connections():
+    """Fecha todas as conexões ociosas de todos os pools."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        while True:
             try:
-                c.execute(f"ALTER TABLE users ADD COLUMN {col_name} {col_type}")
-            except sqlite3.OperationalError:
-                pass # Coluna já existe
-        
-        # Tabela de Produtos
-        c.execute('''CREATE TABLE IF NOT EXISTS products (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL,
-                        brand TEXT,
-                        style TEXT,
-                        type TEXT,
-                        price REAL,
-                        quantity INTEGER,
-                        expiration_date TEXT,
-                        image BLOB
-                    )''')
-        
-        # Tabela de Vendas
-        c.execute('''CREATE TABLE IF NOT EXISTS sales (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        product_id INTEGER,
-                        quantity INTEGER,
-                        total_value REAL,
-                        sale_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        user_id INTEGER,
-                        FOREIGN KEY(product_id) REFERENCES products(id),
-                        FOREIGN KEY(user_id) REFERENCES users(id)
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+# Colunas de metadados do produto (tudo menos o BLOB da imagem)
+PRODUCT_COLUMNS = ['id', 'name', 'brand', 'style', 'type', 'price', 'quantity', 'expiration_date', 'sku']
+_PRODUCT_SELECT = ", ".join(PRODUCT_COLUMNS)
+# Campos de conteúdo do produto (tudo menos id e imagem), cobertos por content_hash
+CONTENT_FIELDS = PRODUCT_COLUMNS[1:]
+_SKU_FIELD = CONTENT_FIELDS.index('sku')
+
+# Cache LRU das imagens de produto e avatares, limitado pelo total de bytes
+# (ver get_product_image e get_user_avatar)
+IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_image_cache = OrderedDict()
+_image_cache_bytes = 0
+_image_cache_lock = threading.Lock()
+
+def get_connection():
+    # Conexão avulsa (fora do pool) já configurada; quem chama deve fechá-la
+    return _open_connection()
+
+# Datas são gravadas como texto ISO (AAAA-MM-DD), que ordena corretamente e
+# permite consultas por intervalo usando índice
+DATE_FORMAT = "%Y-%m-%d"
+_INPUT_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S")
+
+def normalize_date(value):
+    """Converte datas em AAAA-MM-DD ou DD/MM/AAAA para AAAA-MM-DD; vazio vira None."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime(DATE_FORMAT)
+    text = str(value).strip()
+    if not text:
+        return None
+    for fmt in _INPUT_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).strftime(DATE_FORMAT)
+        except ValueError:
+            pass
+    return text  # formato desconhecido: mantém o texto original
+
+# Armazenamento de imagens por conteúdo
+# Os bytes das imagens de produtos e fotos de perfil ficam em arquivos nomeados
+# pelo SHA-256 do conteúdo (images/ab/abcd....png, ao lado do banco); a tabela
+# `images` registra cada arquivo e quantas linhas apontam para ele (mantido por
+# triggers). Imagens iguais são gravadas uma única vez e o store.db guarda só o hash.
+IMAGE_STORE_DIRNAME = "images"
+LEGACY_ASSETS_DIRNAME = "assets"  # imagens antigas '{id}_*', migradas para o armazenamento
+# Arquivos sem linha em `images` (gravados por uma transação que deu rollback)
+# só são apagados depois deste tempo
+ORPHAN_IMAGE_GRACE_SECONDS = 3600
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+def _image_store_dir():
+    return os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), IMAGE_STORE_DIRNAME)
+
+def _image_extension(data):
+    for signature, ext in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return ext
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "bin"
+
+def _image_file(image_hash, ext):
+    return os.path.join(_image_store_dir(), image_hash[:2], f"{image_hash}.{ext}")
+
+def _store_image(c, data):
+    """
+    Grava os bytes no armazenamento (se ainda não existirem) e registra o hash.
+    Deve rodar na mesma transação (BEGIN IMMEDIATE) da linha que vai apontar
+    para a imagem, assim collect_unused_images nunca apaga um arquivo em uso.
+    """
+    data = bytes(data)
+    image_hash = hashlib.sha256(data).hexdigest()
+    ext = _image_extension(data)
+    path = _image_file(image_hash, ext)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    c.execute("INSERT OR IGNORE INTO images (hash, ext, size) VALUES (?, ?, ?)", (image_hash, ext, len(data)))
+    return image_hash
+
+def _read_image(image_hash, ext):
+    # Conteúdo imutável por hash: o cache nunca precisa ser invalidado
+    key = ('image', image_hash)
+    found, image = _image_cache_get(key)
+    if found:
+        return image
+    try:
+        with open(_image_file(image_hash, ext), "rb") as f:
+            image = f.read()
+    except OSError as e:
+        perf.note_error(e)
+        print(f"Erro ao ler imagem {image_hash}: {e}")
+        return None
+    _image_cache_put(key, image)
+    return image
+
+def _remove_orphan_image_files(known_hashes):
+    # _store_image grava o arquivo antes do commit; se a transação deu rollback
+    # o arquivo fica sem linha em `images` e só esta varredura o encontra
+    removed = 0
+    cutoff = time.time() - ORPHAN_IMAGE_GRACE_SECONDS
+    for root, _, files in os.walk(_image_store_dir()):
+        for name in files:
+            if name.split(".", 1)[0] in known_hashes:
+                continue
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+def collect_unused_images():
+    """
+    Apaga do armazenamento as imagens que nenhum produto ou usuário referencia
+    e os arquivos órfãos de transações desfeitas. Retorna quantas.
+    """
+    try:
+        with pooled_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            unused = conn.execute("SELECT hash, ext FROM images WHERE refcount <= 0").fetchall()
+            conn.execute("DELETE FROM images WHERE refcount <= 0")
+            for image_hash, ext in unused:
+                try:
+                    os.remove(_image_file(image_hash, ext))
+                except FileNotFoundError:
+                    pass
+            known_hashes = {row[0] for row in conn.execute("SELECT hash FROM images")}
+            orphans = _remove_orphan_image_files(known_hashes)
+            conn.commit()
+        return len(unused) + orphans
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro ao limpar imagens: {e}")
+        return 0
+
+# Migrações de esquema
+# Cada passo leva o banco da versão N-1 para N (PRAGMA user_version) e roda
+# uma única vez, dentro de uma transação. Novos passos vão sempre no fim da lista.
+
+def _add_missing_columns(c, table, columns):
+    existing = {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+    for col_name, col_type in columns:
+        if col_name not in existing:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {col_name} {col_type}")
+
+def _migration_base_schema(c):
+    # Tabela de Usuários
+    c.execute('''CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    name TEXT
+                )''')
+    _add_missing_columns(c, "users", [
+        ("birth_date", "TEXT"),
+        ("email", "TEXT"),
+        ("phone", "TEXT"),
+        ("cpf", "TEXT"),
+        ("profile_image", "BLOB")
+    ])
+    
+    # Tabela de Produtos
+    c.execute('''CREATE TABLE IF NOT EXISTS products (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    brand TEXT,
+                    style TEXT,
+                    type TEXT,
+                    price REAL,
+                    quantity INTEGER,
+                    expiration_date TEXT,
+                    image BLOB
+                )''')
+    
+    # Tabela de Vendas
+    c.execute('''CREATE TABLE IF NOT EXISTS sales (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    product_id INTEGER,
+                    quantity INTEGER,
+                    total_value REAL,
+                    sale_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    user_id INTEGER,
+                    FOREIGN KEY(product_id) REFERENCES products(id),
+                    FOREIGN KEY(user_id) REFERENCES users(id)
+                )''')
+
+def _migration_catalog_version(c):
+    # Versão do catálogo: incrementada por triggers a cada escrita em products,
+    # usada para saber se a exportação do catálogo (exports.py) ficou desatualizada
+    c.execute('''CREATE TABLE IF NOT EXISTS app_meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )''')
+    c.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('catalog_version', 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS products_version_{event.lower()}
+                      AFTER {event} ON products
+                      BEGIN
+                          UPDATE app_meta SET value = value + 1 WHERE key = 'catalog_version';
+                      END''')
+
+def _migration_products_fts(c):
+    # Índice de busca textual (FTS5) sobre nome/marca/estilo/tipo, sem acentos
+    # e com índices de prefixo; mantido em sincronia por triggers
+    try:
+        c.execute("SAVEPOINT fts")
+        c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                        name, brand, style, type,
+                        content='products', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2',
+                        prefix='2 3'
                     )''')
-        
-        # Criar admin padrão se não existir
-        c.execute("SELECT * FROM users WHERE username = 'admin'")
-        if not c.fetchone():
-            hashed = bcrypt.hashpw('admin123'.encode('utf-8'), bcrypt.gensalt())
-            c.execute("INSERT INTO users (username, password, role, name) VALUES (?, ?, ?, ?)",
-                      ('admin', hashed.decode('utf-8'), 'admin', 'Administrador'))
-        
+        c.execute('''CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products
+                     BEGIN
+                         INSERT INTO products_fts (rowid, name, brand, style, type)
+                         VALUES (new.id, new.name, new.brand, new.style, new.type);
+                     END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products
+                     BEGIN
+                         INSERT INTO products_fts (products_fts, rowid, name, brand, style, type)
+                         VALUES ('delete', old.id, old.name, old.brand, old.style, old.type);
+                     END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, brand, style, type ON products
+                     BEGIN
+                         INSERT INTO products_fts (products_fts, rowid, name, brand, style, type)
+                         VALUES ('delete', old.id, old.name, old.brand, old.style, old.type);
+                         INSERT INTO products_fts (rowid, name, brand, style, type)
+                         VALUES (new.id, new.name, new.brand, new.style, new.type);
+                     END''')
+        c.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+        c.execute("RELEASE fts")
+    except sqlite3.OperationalError as e:
+        c.execute("ROLLBACK TO fts")
+        c.execute("RELEASE fts")
+        print(f"FTS5 indisponível, a busca usará LIKE: {e}")
+
+def _migration_sales_summary(c):
+    # Totais de vendas mantidos por triggers, para o dashboard não somar
+    # o histórico inteiro a cada execução
+    c.execute('''CREATE TABLE IF NOT EXISTS sales_summary (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    sale_count INTEGER NOT NULL DEFAULT 0,
+                    total_quantity INTEGER NOT NULL DEFAULT 0,
+                    total_revenue REAL NOT NULL DEFAULT 0
+                )''')
+    c.execute('''INSERT OR REPLACE INTO sales_summary (id, sale_count, total_quantity, total_revenue)
+                 SELECT 1, COUNT(*), COALESCE(SUM(quantity), 0), COALESCE(SUM(total_value), 0) FROM sales''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS sales_summary_insert AFTER INSERT ON sales
+                 BEGIN
+                     UPDATE sales_summary SET sale_count = sale_count + 1,
+                                              total_quantity = total_quantity + new.quantity,
+                                              total_revenue = total_revenue + new.total_value
+                     WHERE id = 1;
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS sales_summary_update AFTER UPDATE OF quantity, total_value ON sales
+                 BEGIN
+                     UPDATE sales_summary SET total_quantity = total_quantity - old.quantity + new.quantity,
+                                              total_revenue = total_revenue - old.total_value + new.total_value
+                     WHERE id = 1;
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS sales_summary_delete AFTER DELETE ON sales
+                 BEGIN
+                     UPDATE sales_summary SET sale_count = sale_count - 1,
+                                              total_quantity = total_quantity - old.quantity,
+                                              total_revenue = total_revenue - old.total_value
+                     WHERE id = 1;
+                 END''')
+
+def _migration_dates_and_indexes(c):
+    # Normaliza datas antigas gravadas como DD/MM/AAAA (ou vazias)
+    for table, col in (("products", "expiration_date"), ("users", "birth_date")):
+        c.execute(f"UPDATE {table} SET {col} = NULL WHERE {col} = ''")
+        c.execute(f'''UPDATE {table}
+                      SET {col} = substr({col}, 7, 4) || '-' || substr({col}, 4, 2) || '-' || substr({col}, 1, 2)
+                      WHERE {col} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]'
+                  ''')
+    
+    # Índices para relatórios por período, validade e filtros
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales (sale_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sales_product_id ON sales (product_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sales_user_id ON sales (user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_expiration_date ON products (expiration_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_brand_style_type ON products (brand, style, type)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users (role)")
+
+def _migration_birthday_index(c):
+    # Mês-dia do aniversário (MM-DD) como coluna gerada, indexada para a
+    # busca de aniversariantes
+    _add_missing_columns(c, "users", [
+        ("birth_md", "TEXT GENERATED ALWAYS AS (substr(birth_date, 6, 5)) VIRTUAL")
+    ])
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_role_birth_md ON users (role, birth_md)")
+
+def _migration_product_sku(c):
+    # Código SKU / código de barras, único quando preenchido (NULLs não conflitam)
+    _add_missing_columns(c, "products", [("sku", "TEXT")])
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_products_sku ON products (sku)")
+
+def _migration_image_store(c):
+    # Imagens saem das colunas BLOB (products.image, users.profile_image) e dos
+    # arquivos assets/{id}_* para o armazenamento por conteúdo; as colunas
+    # antigas ficam vazias
+    c.execute('''CREATE TABLE IF NOT EXISTS images (
+                    hash TEXT PRIMARY KEY,
+                    ext TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    refcount INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                ) WITHOUT ROWID''')
+    _add_missing_columns(c, "products", [("image_hash", "TEXT")])
+    _add_missing_columns(c, "users", [("avatar_hash", "TEXT")])
+    
+    for table, col in (("products", "image_hash"), ("users", "avatar_hash")):
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_image_ref_insert
+                      AFTER INSERT ON {table} WHEN new.{col} IS NOT NULL
+                      BEGIN
+                          UPDATE images SET refcount = refcount + 1 WHERE hash = new.{col};
+                      END''')
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_image_ref_delete
+                      AFTER DELETE ON {table} WHEN old.{col} IS NOT NULL
+                      BEGIN
+                          UPDATE images SET refcount = refcount - 1 WHERE hash = old.{col};
+                      END''')
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_image_ref_update
+                      AFTER UPDATE OF {col} ON {table} WHEN old.{col} IS NOT new.{col}
+                      BEGIN
+                          UPDATE images SET refcount = refcount - 1 WHERE hash = old.{col};
+                          UPDATE images SET refcount = refcount + 1 WHERE hash = new.{col};
+                      END''')
+    
+    # BLOBs, um de cada vez para não carregar todas as imagens na memória
+    for table, blob_col, hash_col in (("products", "image", "image_hash"), ("users", "profile_image", "avatar_hash")):
+        ids = [row[0] for row in c.execute(f"SELECT id FROM {table} WHERE {blob_col} IS NOT NULL")]
+        for row_id in ids:
+            data = c.execute(f"SELECT {blob_col} FROM {table} WHERE id = ?", (row_id,)).fetchone()[0]
+            image_hash = _store_image(c, data) if len(data) else None
+            c.execute(f"UPDATE {table} SET {hash_col} = ?, {blob_col} = NULL WHERE id = ?", (image_hash, row_id))
+    
+    # Arquivos assets/{id}_*: tinham prioridade sobre o BLOB, então sobrescrevem
+    assets_dir = os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), LEGACY_ASSETS_DIRNAME)
+    if os.path.isdir(assets_dir):
+        seen = set()
+        for name in sorted(os.listdir(assets_dir)):
+            prefix, sep, _ = name.partition("_")
+            if not (sep and prefix.isdigit()) or prefix in seen:
+                continue
+            seen.add(prefix)
+            if not c.execute("SELECT 1 FROM products WHERE id = ?", (int(prefix),)).fetchone():
+                continue
+            with open(os.path.join(assets_dir, name), "rb") as f:
+                image_hash = _store_image(c, f.read())
+            c.execute("UPDATE products SET image_hash = ? WHERE id = ?", (image_hash, int(prefix)))
+
+def _migration_product_content_hash(c):
+    # Hash do conteúdo gravado pela sincronização (sync_products); qualquer
+    # outra escrita nesses campos (cadastro, vendas) o zera, então um hash
+    # presente sempre confere com a linha
+    _add_missing_columns(c, "products", [("content_hash", "TEXT")])
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS products_content_hash_reset
+                  AFTER UPDATE OF {", ".join(CONTENT_FIELDS)} ON products
+                  WHEN new.content_hash IS NOT NULL AND new.content_hash IS old.content_hash
+                  BEGIN
+                      UPDATE products SET content_hash = NULL WHERE id = new.id;
+                  END''')
+    
+    rows = c.execute(f"SELECT id, {', '.join(CONTENT_FIELDS)} FROM products").fetchall()
+    c.executemany("UPDATE products SET content_hash = ? WHERE id = ?",
+                  [(product_content_hash(row[1:]), row[0]) for row in rows])
+
+MIGRATIONS = [
+    _migration_base_schema,
+    _migration_catalog_version,
+    _migration_products_fts,
+    _migration_sales_summary,
+    _migration_dates_and_indexes,
+    _migration_birthday_index,
+    _migration_product_sku,
+    _migration_image_store,
+    _migration_product_content_hash,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_schema_version():
+    with pooled_connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate():
+    """
+    Aplica as migrações pendentes, em ordem. Retorna a lista de versões aplicadas.
+    Cada passo roda em BEGIN IMMEDIATE, então dois processos subindo ao mesmo
+    tempo não aplicam o mesmo passo duas vezes.
+    """
+    applied = []
+    with pooled_connection() as conn:
+        while True:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                conn.rollback()
+                break
+            MIGRATIONS[version](conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+            applied.append(version + 1)
+        if MIGRATIONS.index(_migration_image_store) + 1 in applied:
+            # Devolve ao sistema o espaço que as imagens ocupavam no arquivo;
+            # se falhar (outra conexão lendo), fica para a próxima vez que o banco for compactado
+            try:
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.OperationalError as e:
+                print(f"Erro ao compactar o banco após migração: {e}")
+    _fts_available.pop(DB_NAME, None)
+    return applied
+
+def _ensure_default_admin():
+    # Criar admin padrão se não existir
+    with pooled_connection() as conn:
+        if conn.execute("SELECT 1 FROM users WHERE username = 'admin'").fetchone():
+            return
+        hashed = hash_password('admin123')
+        conn.execute("INSERT OR IGNORE INTO users (username, password, role, name) VALUES (?, ?, ?, ?)",
+                     ('admin', hashed, 'admin', 'Administrador'))
         conn.commit()
+
+def init_db():
+    """
+    Deixa o banco pronto para uso: aplica migrações pendentes e garante o
+    admin padrão. Barato quando não há nada a fazer, mas o app chama uma
+    única vez por processo (ver bootstrap em app.py). Repassa o erro: o app
+    não deve subir com o banco pela metade.
+    """
+    try:
+        applied = migrate()
+        if applied:
+            print(f"Migrações aplicadas: {applied}")
+        _ensure_default_admin()
+        collect_unused_images()
     except Exception as e:
+        perf.note_error(e)
         print(f"Erro ao inicializar DB: {e}")
-    finally:
-        try:
-            conn.close()
-        except:
-            pass
+        raise
 
-def get_connection():
-    # Helper para criar conexão com timeout maior para evitar locks
-    return sqlite3.connect(DB_NAME, timeout=10)
+# Senhas
+# bcrypt roda num pool de threads limitado (o bcrypt libera o GIL): com vários
+# logins ao mesmo tempo, no máximo PASSWORD_WORKERS hashes disputam a CPU e as
+# demais sessões continuam respondendo. O custo vem de BCRYPT_ROUNDS; hashes
+# com outro custo são refeitos no próximo login bem-sucedido.
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", min(4, os.cpu_count() or 1)))
+
+_password_executor = None
+_password_executor_lock = threading.Lock()
+
+def _get_password_executor():
+    global _password_executor
+    with _password_executor_lock:
+        if _password_executor is None:
+            _password_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+        return _password_executor
+
+def configure_password_hashing(rounds=None, workers=None):
+    """Altera o custo do bcrypt e/ou o tamanho do pool (o pool antigo termina o que já recebeu)."""
+    global BCRYPT_ROUNDS, PASSWORD_WORKERS, _password_executor
+    with _password_executor_lock:
+        if rounds is not None:
+            BCRYPT_ROUNDS = int(rounds)
+        if workers is not None and int(workers) != PASSWORD_WORKERS:
+            PASSWORD_WORKERS = int(workers)
+            if _password_executor is not None:
+                _password_executor.shutdown(wait=False)
+                _password_executor = None
+
+def _hash_password_sync(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check_password_sync(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+def hash_password(password):
+    """Gera o hash bcrypt (custo BCRYPT_ROUNDS) no pool de senhas."""
+    return _get_password_executor().submit(_hash_password_sync, password, BCRYPT_ROUNDS).result()
+
+def verify_password(password, hashed):
+    """Confere a senha com o hash no pool de senhas."""
+    return _get_password_executor().submit(_check_password_sync, password, hashed).result()
+
+def password_needs_rehash(hashed):
+    # Formato '$2b$12$...': o custo é o terceiro campo
+    try:
+        return int(hashed.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+# Usuário mantido em st.session_state: só o necessário para a sessão, sem o
+# hash da senha nem a foto (buscada sob demanda em get_user_avatar)
+SessionUser = namedtuple('SessionUser', ['id', 'username', 'role', 'name'])
 
 def check_login(username, password):
-    conn = None
     try:
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("SELECT * FROM users WHERE username = ?", (username,))
-        user = c.fetchone()
+        with pooled_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT id, username, password, role, name FROM users WHERE username = ?", (username,))
+            user = c.fetchone()
         
-        if user and bcrypt.checkpw(password.encode('utf-8'), user[2].encode('utf-8')):
-            return user # (id, username, password, role, name)
+        if user and verify_password(password, user[2]):
+            if password_needs_rehash(user[2]):
+                _rehash_password(user[0], user[2], password)
+            return SessionUser(user[0], user[1], user[3], user[4])
         return None
     except Exception as e:
+        perf.note_error(e)
         print(f"Erro no login: {e}")
         return None
-    finally:
-        if conn: conn.close()
+
+def _rehash_password(user_id, old_hash, password):
+    # Troca o hash só se ninguém alterou a senha entretanto; falha aqui não impede o login
+    try:
+        new_hash = hash_password(password)
+        with pooled_connection() as conn:
+            conn.execute("UPDATE users SET password = ? WHERE id = ? AND password = ?", (new_hash, user_id, old_hash))
+            conn.commit()
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro ao atualizar hash da senha: {e}")
 
 def create_user(username, password, role, name, birth_date=None, email=None, phone=None, cpf=None):
-    conn = None
     try:
-        conn = get_connection()
-        c = conn.cursor()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        c.execute("INSERT INTO users (username, password, role, name, birth_date, email, phone, cpf) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                  (username, hashed.decode('utf-8'), role, name, birth_date, email, phone, cpf))
-        conn.commit()
+        hashed = hash_password(password)
+        birth_date = normalize_date(birth_date)
+        with pooled_connection() as conn:
+            c = conn.cursor()
+            c.execute("INSERT INTO users (username, password, role, name, birth_date, email, phone, cpf) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                      (username, hashed, role, name, birth_date, email, phone, cpf))
+            conn.commit()
         return True
     except sqlite3.IntegrityError:
         return False
     except Exception as e:
+        perf.note_error(e)
         print(f"Erro ao criar usuário: {e}")
         return False
-    finally:
-        if conn: conn.close()
 
 def update_user_image(user_id, image_bytes):
-    conn = None
+    """Grava a foto de perfil (já reduzida por quem chama, ver utils.make_avatar)."""
     try:
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("UPDATE users SET profile_image = ? WHERE id = ?", (image_bytes, user_id))
-        conn.commit()
-        
-        # Retorna o usuário atualizado para atualizar a sessão
-        c.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-        updated_user = c.fetchone()
-        return updated_user
+        with pooled_connection() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                image_hash = _store_image(c, image_bytes) if image_bytes else None
+                c.execute("UPDATE users SET avatar_hash = ? WHERE id = ?", (image_hash, user_id))
+                updated = c.rowcount > 0
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return updated
     except Exception as e:
+        perf.note_error(e)
         print(f"Erro ao atualizar imagem do usuário: {e}")
+        return False
+
+def get_user_avatar(user_id):
+    """Retorna os bytes da foto de perfil (ou None), usando o cache LRU de imagens."""
+    try:
+        with pooled_connection() as conn:
+            row = conn.execute('''SELECT i.hash, i.ext FROM users u JOIN images i ON i.hash = u.avatar_hash
+                                  WHERE u.id = ?''', (int(user_id),)).fetchone()
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro ao buscar foto do usuário: {e}")
         return None
-    finally:
-        if conn: conn.close()
+    return _read_image(*row) if row else None
 
-def get_birthday_clients():
-    conn = None
+def get_users():
     try:
-        conn = get_connection()
-        df = pd.read_sql_query("SELECT * FROM users WHERE role='cliente' AND birth_date IS NOT NULL AND birth_date != ''", conn)
-        return df
+        with pooled_connection() as conn:
+            return pd.read_sql_query("SELECT id, username, role, name, email, phone FROM users", conn)
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro ao listar usuários: {e}")
+        return pd.DataFrame()
+
+def get_birthday_clients(days=0, today=None):
+    """
+    Clientes que fazem aniversário hoje ou nos próximos `days` dias.
+    Filtra pelo índice de (role, birth_md) e retorna só os dados de contato,
+    com a coluna `days_until` (0 = hoje), ordenados pela proximidade.
+    """
+    today = today or datetime.date.today()
+    days = max(0, min(int(days), 365))
+    offsets = {}
+    for offset in range(days + 1):
+        day = today + datetime.timedelta(days=offset)
+        offsets.setdefault(day.strftime("%m-%d"), offset)
+        # Nascidos em 29/02 comemoram em 28/02 nos anos não bissextos
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            offsets.setdefault("02-29", offset)
+    
+    try:
+        placeholders = ", ".join("?" for _ in offsets)
+        query = f"""SELECT id, name, phone, email, birth_date, birth_md FROM users
+                    WHERE role = 'cliente' AND birth_md IN ({placeholders})"""
+        with pooled_connection() as conn:
+            df = pd.read_sql_query(query, conn, params=list(offsets))
+        df['days_until'] = df.pop('birth_md').map(offsets)
+        return df.sort_values(['days_until', 'name']).reset_index(drop=True)
     except Exception as e:
+        perf.note_error(e)
         print(f"Erro ao buscar aniversariantes: {e}")
         return pd.DataFrame()
-    finally:
-        if conn: conn.close()
 
-def add_product(nome, marca, estilo, tipo, preco, quantidade, data_validade, image_bytes, id=None):
-    conn = None
+def normalize_sku(value):
+    """Remove espaços do código; vazio vira None (o índice único aceita vários NULLs)."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    text = str(value).strip()
+    return text or None
+
+def add_product(nome, marca, estilo, tipo, preco, quantidade, data_validade, image_bytes, id=None, sku=None):
     try:
-        conn = get_connection()
-        c = conn.cursor()
-        if id is not None:
-            c.execute('''INSERT OR REPLACE INTO products (id, name, brand, style, type, price, quantity, expiration_date, image)
-                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                      (id, nome, marca, estilo, tipo, preco, quantidade, data_validade, image_bytes))
-        else:
-            c.execute('''INSERT INTO products (name, brand, style, type, price, quantity, expiration_date, image)
-                         VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
-                      (nome, marca, estilo, tipo, preco, quantidade, data_validade, image_bytes))
-        conn.commit()
+        data_validade = normalize_date(data_validade)
+        sku = normalize_sku(sku)
+        with pooled_connection() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                image_hash = _store_image(c, image_bytes) if image_bytes else None
+                if id is not None:
+                    c.execute('''INSERT OR REPLACE INTO products (id, name, brand, style, type, price, quantity, expiration_date, image_hash, sku)
+                                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                              (id, nome, marca, estilo, tipo, preco, quantidade, data_validade, image_hash, sku))
+                else:
+                    c.execute('''INSERT INTO products (name, brand, style, type, price, quantity, expiration_date, image_hash, sku)
+                                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                              (nome, marca, estilo, tipo, preco, quantidade, data_validade, image_hash, sku))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
     except Exception as e:
+        perf.note_error(e)
         print(f"Erro ao adicionar produto: {e}")
         raise e
-    finally:
-        if conn: conn.close()
 
-def get_products():
-    conn = None
+def get_catalog_version():
+    """Contador incrementado a cada inserção, alteração ou exclusão de produto."""
+    with pooled_connection() as conn:
+        row = conn.execute("SELECT value FROM app_meta WHERE key = 'catalog_version'").fetchone()
+    return row[0] if row else 0
+
+def get_products(columns=None):
+    """
+    Retorna o catálogo inteiro, sem a imagem: a coluna `has_image` indica se o
+    produto tem imagem no armazenamento (obtida com get_product_image(id)).
+    `columns` restringe o resultado às colunas pedidas. As views usam as
+    consultas paginadas (get_products_page, search_pos_products); esta fica
+    para scripts e testes e não tem cache.
+    """
     try:
-        conn = get_connection()
-        df = pd.read_sql_query("SELECT * FROM products", conn)
-        return df
+        with pooled_connection() as conn:
+            df = pd.read_sql_query(f"SELECT {_PRODUCT_SELECT}, image_hash IS NOT NULL AS has_image FROM products", conn)
+        return df[list(columns)] if columns is not None else df
     except Exception as e:
+        perf.note_error(e)
         print(f"Erro ao listar produtos: {e}")
         return pd.DataFrame()
-    finally:
-        if conn: conn.close()
 
-def update_product(id, nome, marca, estilo, tipo, preco, quantidade, data_validade, image_bytes=None):
-    conn = None
+# Pesos do bm25 por coluna do índice: name, brand, style, type
+_FTS_WEIGHTS = "10.0, 5.0, 1.0, 1.0"
+_fts_available = {}
+
+def _has_fts():
+    if DB_NAME not in _fts_available:
+        with pooled_connection() as conn:
+            row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'").fetchone()
+        _fts_available[DB_NAME] = row is not None
+    return _fts_available[DB_NAME]
+
+def _fts_query(search):
+    # Cada palavra vira um prefixo entre aspas: "fragr"* AND "oleo"*
+    terms = re.findall(r"\w+", search or "")
+    return " AND ".join(f'"{term}"*' for term in terms)
+
+def _like_clause(search):
+    # Alternativa sem FTS5: filtro por nome ou marca
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    like = f"%{escaped}%"
+    return "WHERE name LIKE ? ESCAPE '\\' OR brand LIKE ? ESCAPE '\\'", [like, like]
+
+def search_products(search, limit=50, offset=0):
+    """
+    Busca textual em nome, marca, estilo e tipo, ignorando acentos e
+    maiúsculas e aceitando prefixos ("frag" encontra "Fragrância").
+    Resultados (sem BLOBs) ordenados por relevância.
+    """
     try:
-        conn = get_connection()
-        c = conn.cursor()
-        if image_bytes:
-            c.execute('''UPDATE products SET name=?, brand=?, style=?, type=?, price=?, quantity=?, expiration_date=?, image=?
-                         WHERE id=?''',
-                      (nome, marca, estilo, tipo, preco, quantidade, data_validade, image_bytes, id))
-        else:
-            c.execute('''UPDATE products SET name=?, brand=?, style=?, type=?, price=?, quantity=?, expiration_date=?
-                         WHERE id=?''',
-                      (nome, marca, estilo, tipo, preco, quantidade, data_validade, id))
-        conn.commit()
+        with pooled_connection() as conn:
+            if _has_fts():
+                match = _fts_query(search)
+                if not match:
+                    return pd.DataFrame(columns=PRODUCT_COLUMNS + ['has_image'])
+                query = f"""SELECT {", ".join("p." + col for col in PRODUCT_COLUMNS)}, p.image_hash IS NOT NULL AS has_image
+                            FROM products_fts
+                            JOIN products p ON p.id = products_fts.rowid
+                            WHERE products_fts MATCH ?
+                            ORDER BY bm25(products_fts, {_FTS_WEIGHTS}), p.id
+                            LIMIT ? OFFSET ?"""
+                params = [match]
+            else:
+                where, params = _like_clause(search)
+                query = f"""SELECT {_PRODUCT_SELECT}, image_hash IS NOT NULL AS has_image FROM products {where}
+                            ORDER BY id LIMIT ? OFFSET ?"""
+            return pd.read_sql_query(query, conn, params=params + [int(limit), int(offset)])
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro na busca de produtos: {e}")
+        return pd.DataFrame()
+
+def count_products(search=None):
+    """Total de produtos que atendem à busca `search` (todos, se vazia)."""
+    try:
+        with pooled_connection() as conn:
+            if not search:
+                return conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+            if _has_fts():
+                match = _fts_query(search)
+                if not match:
+                    return 0
+                return conn.execute("SELECT COUNT(*) FROM products_fts WHERE products_fts MATCH ?", (match,)).fetchone()[0]
+            where, params = _like_clause(search)
+            return conn.execute(f"SELECT COUNT(*) FROM products {where}", params).fetchone()[0]
     except Exception as e:
+        perf.note_error(e)
+        print(f"Erro ao contar produtos: {e}")
+        return 0
+
+def get_products_page(page=1, page_size=24, search=None):
+    """
+    Uma página do catálogo (sem BLOBs). Sem busca, ordenada por id; com busca,
+    por relevância (ver search_products). `page` começa em 1; use
+    count_products() para o total de páginas.
+    """
+    offset = max(int(page) - 1, 0) * int(page_size)
+    if search:
+        return search_products(search, limit=page_size, offset=offset)
+    try:
+        query = f"""SELECT {_PRODUCT_SELECT}, image_hash IS NOT NULL AS has_image FROM products
+                    ORDER BY id LIMIT ? OFFSET ?"""
+        with pooled_connection() as conn:
+            return pd.read_sql_query(query, conn, params=[int(page_size), offset])
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro ao paginar produtos: {e}")
+        return pd.DataFrame()
+
+def update_product(id, nome, marca, estilo, tipo, preco, quantidade, data_validade, image_bytes=None, sku=None):
+    # A imagem só é trocada quando há uma nova (a mesma imagem mantém o hash e
+    # não grava nada); o SKU é sempre gravado (None limpa)
+    try:
+        data_validade = normalize_date(data_validade)
+        sku = normalize_sku(sku)
+        with pooled_connection() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                if image_bytes:
+                    image_hash = _store_image(c, image_bytes)
+                    c.execute('''UPDATE products SET name=?, brand=?, style=?, type=?, price=?, quantity=?, expiration_date=?, sku=?, image_hash=?
+                                 WHERE id=?''',
+                              (nome, marca, estilo, tipo, preco, quantidade, data_validade, sku, image_hash, id))
+                else:
+                    c.execute('''UPDATE products SET name=?, brand=?, style=?, type=?, price=?, quantity=?, expiration_date=?, sku=?
+                                 WHERE id=?''',
+                              (nome, marca, estilo, tipo, preco, quantidade, data_validade, sku, id))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    except Exception as e:
+        perf.note_error(e)
         print(f"Erro ao atualizar produto: {e}")
         raise e
-    finally:
-        if conn: conn.close()
 
 def delete_product(id):
-    conn = None
     try:
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("DELETE FROM products WHERE id=?", (id,))
-        conn.commit()
+        with pooled_connection() as conn:
+            c = conn.cursor()
+            c.execute("DELETE FROM products WHERE id=?", (id,))
+            conn.commit()
     except Exception as e:
+        perf.note_error(e)
         print(f"Erro ao deletar produto: {e}")
-    finally:
-        if conn: conn.close()
 
 def register_sale(product_id, quantity, user_id=None):
-    conn = None
+    """
+    Baixa o estoque e registra a venda. A verificação e a baixa são um único
+    UPDATE condicional (WHERE quantity >= ?) sob BEGIN IMMEDIATE, então duas
+    sessões simultâneas nunca vendem o mesmo estoque.
+    """
+    if quantity <= 0:
+        return False, "Quantidade inválida"
     try:
-        conn = get_connection()
-        c = conn.cursor()
-        
-        # Verificar estoque e preço
-        c.execute("SELECT price, quantity FROM products WHERE id=?", (product_id,))
-        res = c.fetchone()
-        if not res:
-            return False, "Produto não encontrado"
-        
-        price, current_qty = res
-        if current_qty < quantity:
-            return False, "Estoque insuficiente"
-        
-        total_value = price * quantity
-        
-        # Atualizar estoque
-        c.execute("UPDATE products SET quantity = quantity - ? WHERE id=?", (quantity, product_id))
-        
-        # Registrar venda
-        c.execute("INSERT INTO sales (product_id, quantity, total_value, user_id) VALUES (?, ?, ?, ?)",
-                  (product_id, quantity, total_value, user_id))
-        
-        conn.commit()
+        with pooled_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute('''UPDATE products SET quantity = quantity - ?
+                                  WHERE id = ? AND quantity >= ?
+                                  RETURNING price''', (quantity, product_id, quantity)).fetchone()
+            if row is None:
+                exists = conn.execute("SELECT 1 FROM products WHERE id=?", (product_id,)).fetchone()
+                conn.rollback()
+                return False, "Estoque insuficiente" if exists else "Produto não encontrado"
+            
+            # Registrar venda
+            conn.execute("INSERT INTO sales (product_id, quantity, total_value, user_id) VALUES (?, ?, ?, ?)",
+                         (product_id, quantity, float(row[0]) * quantity, user_id))
+            conn.commit()
         return True, "Venda realizada com sucesso"
     except Exception as e:
-        if conn: conn.rollback()
+        perf.note_error(e)
         print(f"Erro na venda: {e}")
         return False, f"Erro ao processar venda: {e}"
-    finally:
-        if conn: conn.close()
+
+def register_sales_batch(items, user_id=None):
+    """
+    Registra as vendas de um carrinho em uma única transação.
+    `items` é uma lista de (product_id, quantidade). O lock de escrita é obtido
+    uma vez (BEGIN IMMEDIATE); cada linha baixa o estoque com um UPDATE
+    condicional e as vendas são gravadas juntas com executemany.
+    Tudo ou nada: se alguma linha falhar, nada é gravado.
+    Retorna (sucesso, mensagem, resultados), um resultado por linha:
+    {'product_id', 'quantity', 'ok', 'message', 'total_value'}.
+    """
+    if not items:
+        return False, "Carrinho vazio", []
+    
+    results = []
+    try:
+        with pooled_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            sale_rows = []
+            for product_id, quantity in items:
+                result = {'product_id': product_id, 'quantity': quantity, 'ok': False,
+                          'message': '', 'total_value': 0.0}
+                results.append(result)
+                if quantity <= 0:
+                    result['message'] = "Quantidade inválida"
+                    continue
+                
+                row = conn.execute('''UPDATE products SET quantity = quantity - ?
+                                      WHERE id = ? AND quantity >= ?
+                                      RETURNING price''', (quantity, product_id, quantity)).fetchone()
+                if row is None:
+                    exists = conn.execute("SELECT 1 FROM products WHERE id=?", (product_id,)).fetchone()
+                    result['message'] = "Estoque insuficiente" if exists else "Produto não encontrado"
+                    continue
+                
+                result.update(ok=True, message="OK", total_value=float(row[0]) * quantity)
+                sale_rows.append((product_id, quantity, result['total_value'], user_id))
+            
+            failed = [r for r in results if not r['ok']]
+            if failed:
+                conn.rollback()
+                return False, f"Venda não realizada: {len(failed)} item(ns) com problema", results
+            
+            conn.executemany("INSERT INTO sales (product_id, quantity, total_value, user_id) VALUES (?, ?, ?, ?)",
+                             sale_rows)
+            conn.commit()
+        return True, "Venda realizada com sucesso", results
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro na venda: {e}")
+        return False, f"Erro ao processar venda: {e}", results
 
 def get_sales_report():
-    conn = None
     try:
-        conn = get_connection()
         query = '''
             SELECT s.id, p.name as product_name, s.quantity, s.total_value, s.sale_date, u.name as user_name
             FROM sales s
             LEFT JOIN products p ON s.product_id = p.id
             LEFT JOIN users u ON s.user_id = u.id
         '''
-        df = pd.read_sql_query(query, conn)
+        with pooled_connection() as conn:
+            df = pd.read_sql_query(query, conn)
         return df
     except Exception as e:
+        perf.note_error(e)
         print(f"Erro no relatório: {e}")
         return pd.DataFrame()
-    finally:
-        if conn: conn.close()
+
+# Importação em massa
+# Colunas do CSV (em português, as mesmas da exportação) -> colunas de products
+IMPORT_COLUMNS = {
+    'nome': 'name', 'marca': 'brand', 'estilo': 'style', 'tipo': 'type',
+    'preco': 'price', 'quantidade': 'quantity', 'data_validade': 'expiration_date',
+    'sku': 'sku'
+}
+IMPORT_CHUNK_SIZE = 5000
+# SKU é texto: lido como número perderia zeros à esquerda (ou viraria 789...0.0)
+_IMPORT_DTYPES = {'sku': str}
+
+def _text_column(df, col, default=''):
+    if col not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[col].where(df[col].notna(), default).astype(str)
+
+def _number_column(df, col):
+    # Valores inválidos ou negativos viram 0, como no cadastro manual
+    if col not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    values = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return values.where(values >= 0, 0)
+
+def _date_column(df, col):
+    # AAAA-MM-DD ou DD/MM/AAAA -> AAAA-MM-DD; outros textos são mantidos, vazio vira None
+    if col not in df.columns:
+        return pd.Series(None, index=df.index, dtype=object)
+    text = df[col].where(df[col].notna(), '').astype(str).str.strip()
+    parsed = pd.to_datetime(text, format="%Y-%m-%d", errors='coerce')
+    parsed = parsed.fillna(pd.to_datetime(text, format="%d/%m/%Y", errors='coerce'))
+    result = parsed.dt.strftime(DATE_FORMAT).astype(object).where(parsed.notna(), text)
+    return result.where(result != '', None)
+
+def prepare_import(df, allowed_values=None):
+    """
+    Valida e normaliza (de forma vetorizada) um DataFrame com as colunas do CSV.
+    `allowed_values` mapeia 'marca'/'estilo'/'tipo' para as listas aceitas;
+    valores fora da lista viram 'Outra'/'Outro'.
+    Retorna (DataFrame pronto para gravar, lista de erros (linha, nome, mensagem)).
+    A linha é a do arquivo, contando o cabeçalho.
+    """
+    allowed_values = allowed_values or {}
+    defaults = {'marca': 'Outra', 'estilo': 'Outro', 'tipo': 'Outro'}
+    
+    out = pd.DataFrame(index=df.index)
+    out['name'] = _text_column(df, 'nome').str.strip()
+    for col, default in defaults.items():
+        values = _text_column(df, col, default)
+        if col in allowed_values:
+            values = values.where(values.isin(allowed_values[col]), default)
+        out[IMPORT_COLUMNS[col]] = values
+    out['price'] = _number_column(df, 'preco').astype(float)
+    out['quantity'] = _number_column(df, 'quantidade').astype(int)
+    out['expiration_date'] = _date_column(df, 'data_validade')
+    sku = _text_column(df, 'sku').str.strip()
+    # object antes do where: numa coluna de texto o None viraria NaN
+    out['sku'] = sku.astype(object).where(sku != '', None)
+    
+    ids = pd.to_numeric(df['id'], errors='coerce') if 'id' in df.columns else pd.Series(float('nan'), index=df.index)
+    # Coluna object com int/None: um .map() sobre ela voltaria a ser float com NaN
+    out['id'] = pd.Series([int(v) if pd.notna(v) else None for v in ids], index=df.index, dtype=object)
+    
+    empty_name = out['name'] == ''
+    errors = [(int(idx) + 2, 'Desconhecido', "Nome do produto vazio") for idx in out.index[empty_name]]
+    return out[~empty_name], errors
+
+_INSERT_PRODUCT = '''INSERT INTO products (name, brand, style, type, price, quantity, expiration_date, sku)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)'''
+# Atualiza o produto com o mesmo id sem apagá-lo: INSERT OR REPLACE também
+# apagaria em silêncio outro produto que já tivesse o mesmo SKU
+_REPLACE_PRODUCT = '''INSERT INTO products (id, name, brand, style, type, price, quantity, expiration_date, sku)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                      ON CONFLICT(id) DO UPDATE SET name = excluded.name, brand = excluded.brand,
+                          style = excluded.style, type = excluded.type, price = excluded.price,
+                          quantity = excluded.quantity, expiration_date = excluded.expiration_date,
+                          sku = excluded.sku'''
+
+def import_products(df, allowed_values=None):
+    """
+    Grava um bloco do CSV em uma única transação com executemany.
+    Linhas com `id` sobrescrevem os campos do produto existente (a imagem é
+    mantida); um SKU que já pertence a outro produto vira erro da linha.
+    Se o lote falhar, as linhas são regravadas uma a uma para isolar os erros.
+    Retorna {'imported': n, 'failed': n, 'errors': [(linha, nome, mensagem), ...]}.
+    """
+    rows, errors = prepare_import(df, allowed_values)
+    fields = ['name', 'brand', 'style', 'type', 'price', 'quantity', 'expiration_date', 'sku']
+    has_id = rows['id'].notna()
+    new_rows = list(rows.loc[~has_id, fields].itertuples(index=False, name=None))
+    replace_rows = list(rows.loc[has_id, ['id'] + fields].itertuples(index=False, name=None))
+    
+    imported = 0
+    with pooled_connection() as conn:
+        try:
+            conn.execute("BEGIN")
+            conn.executemany(_INSERT_PRODUCT, new_rows)
+            conn.executemany(_REPLACE_PRODUCT, replace_rows)
+            conn.commit()
+            imported = len(rows)
+        except sqlite3.Error:
+            conn.rollback()
+            conn.execute("BEGIN")
+            for idx, row in rows.iterrows():
+                try:
+                    if not pd.isna(row['id']):
+                        conn.execute(_REPLACE_PRODUCT, [row['id']] + [row[f] for f in fields])
+                    else:
+                        conn.execute(_INSERT_PRODUCT, [row[f] for f in fields])
+                    imported += 1
+                except sqlite3.Error as e:
+                    errors.append((int(idx) + 2, row['name'], str(e)))
+            conn.commit()
+    
+    errors.sort()
+    return {'imported': imported, 'failed': len(errors), 'errors': errors}
+
+def import_products_csv(file, allowed_values=None, chunksize=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Importa um CSV (separador detectado automaticamente) em blocos de
+    `chunksize` linhas, cada um na sua transação, mantendo a memória limitada.
+    `progress(linhas_processadas)` é chamado após cada bloco.
+    Lança ValueError se o arquivo não tiver a coluna 'nome'.
+    """
+    report = {'imported': 0, 'failed': 0, 'errors': []}
+    processed = 0
+    for chunk in pd.read_csv(file, sep=None, engine='python', dtype=_IMPORT_DTYPES, chunksize=chunksize):
+        if 'nome' not in chunk.columns:
+            raise ValueError("O arquivo CSV deve conter pelo menos a coluna 'nome'.")
+        result = import_products(chunk, allowed_values)
+        report['imported'] += result['imported']
+        report['failed'] += result['failed']
+        report['errors'].extend(result['errors'])
+        processed += len(chunk)
+        if progress:
+            progress(processed)
+    return report
+
+# Sincronização incremental (ex.: feed diário do fornecedor)
+# Cada linha é casada com um produto pelo `id` ou, sem id, pelo `sku`; só as
+# colunas que mudaram são gravadas (INSERT ... ON CONFLICT DO UPDATE) e as
+# linhas iguais não são tocadas, preservando a imagem e o resto do cadastro.
+SYNC_PREVIEW_LIMIT = 500
+
+def product_content_hash(values):
+    """Hash dos campos de CONTENT_FIELDS (na mesma ordem), normalizados."""
+    name, brand, style, type_, price, quantity, expiration_date, sku = values
+    normalized = [name, brand, style, type_,
+                  None if price is None else float(price),
+                  None if quantity is None else int(quantity),
+                  expiration_date, sku]
+    return hashlib.sha1(json.dumps(normalized, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def _same_value(old, new):
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+        return float(old) == float(new)
+    return old == new
+
+def _upsert_sql(columns):
+    # Insere (id novo) ou atualiza só `columns`, se o conteúdo mudou
+    fields = ", ".join(CONTENT_FIELDS)
+    updates = ", ".join(f"{col} = excluded.{col}" for col in list(columns) + ['content_hash'])
+    return f'''INSERT INTO products (id, {fields}, content_hash) VALUES ({", ".join("?" * (len(CONTENT_FIELDS) + 2))})
+               ON CONFLICT(id) DO UPDATE SET {updates}
+               WHERE products.content_hash IS NOT excluded.content_hash'''
+
+def _existing_products(conn, key, values):
+    found = {}
+    values = list(values)
+    for start in range(0, len(values), IMPORT_CHUNK_SIZE):
+        part = values[start:start + IMPORT_CHUNK_SIZE]
+        query = (f"SELECT id, content_hash, {', '.join(CONTENT_FIELDS)} FROM products "
+                 f"WHERE {key} IN ({', '.join('?' * len(part))})")
+        for row in conn.execute(query, part):
+            item = {'id': row[0], 'hash': row[1], 'values': list(row[2:])}
+            found[item['id'] if key == 'id' else item['values'][_SKU_FIELD]] = item
+    return found
+
+def _describe_changes(old_values, new_values, columns):
+    labels = {field: col for col, field in IMPORT_COLUMNS.items()}
+    return "; ".join(f"{labels.get(col, col)}: {old_values[CONTENT_FIELDS.index(col)]} → {new_values[CONTENT_FIELDS.index(col)]}"
+                     for col in columns)
+
+def sync_products(df, allowed_values=None, dry_run=False):
+    """
+    Sincroniza um bloco do CSV com o catálogo, em uma transação: linhas novas
+    são inseridas, linhas que mudaram atualizam só as colunas diferentes e
+    linhas iguais (mesmo content_hash ou mesmos valores) são ignoradas.
+    Colunas ausentes do CSV mantêm o valor atual dos produtos existentes.
+    Com `dry_run` nada é gravado; o relatório mostra o que seria feito.
+    Retorna {'rows', 'inserted', 'updated', 'unchanged', 'failed', 'errors',
+    'changes': [(linha, id, nome, ação, alterações), ...]}.
+    """
+    rows, errors = prepare_import(df, allowed_values)
+    present = [IMPORT_COLUMNS[col] for col in df.columns if col in IMPORT_COLUMNS]
+    report = {'rows': len(df), 'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'errors': errors, 'changes': []}
+    
+    with pooled_connection() as conn:
+        conn.execute("BEGIN" if dry_run else "BEGIN IMMEDIATE")
+        by_id = _existing_products(conn, 'id', {int(i) for i in rows['id'].dropna()})
+        skus = {s for s in rows.loc[rows['id'].isna(), 'sku'].dropna()}
+        by_sku = _existing_products(conn, 'sku', skus)
+        
+        for idx, row in zip(rows.index, rows[['id'] + CONTENT_FIELDS].itertuples(index=False, name=None)):
+            line, row_id, values = int(idx) + 2, None if pd.isna(row[0]) else int(row[0]), list(row[1:])
+            current = by_id.get(row_id) if row_id is not None else by_sku.get(values[_SKU_FIELD])
+            if current is not None:
+                # Produto existente: colunas ausentes do CSV ficam como estão
+                values = [values[i] if field in present else current['values'][i] for i, field in enumerate(CONTENT_FIELDS)]
+            content_hash = product_content_hash(values)
+            
+            if current is None:
+                action, columns = 'inserir', CONTENT_FIELDS
+            elif current['hash'] == content_hash:
+                report['unchanged'] += 1
+                continue
+            else:
+                columns = [f for i, f in enumerate(CONTENT_FIELDS) if not _same_value(current['values'][i], values[i])]
+                if not columns:
+                    report['unchanged'] += 1
+                    continue
+                action, row_id = 'atualizar', current['id']
+            
+            try:
+                if not dry_run:
+                    cursor = conn.execute(_upsert_sql(columns), [row_id] + values + [content_hash])
+                    if row_id is None:
+                        row_id = cursor.lastrowid
+            except sqlite3.Error as e:
+                errors.append((line, values[0], str(e)))
+                continue
+            
+            report['inserted' if action == 'inserir' else 'updated'] += 1
+            if len(report['changes']) < SYNC_PREVIEW_LIMIT:
+                details = "" if action == 'inserir' else _describe_changes(current['values'], values, columns)
+                report['changes'].append((line, row_id, values[0], action, details))
+            # Linhas repetidas no mesmo bloco comparam com o que acabou de ser gravado
+            item = {'id': row_id, 'hash': content_hash, 'values': values}
+            if row_id is not None:
+                by_id[row_id] = item
+            if values[_SKU_FIELD] is not None:
+                by_sku[values[_SKU_FIELD]] = item
+        
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    
+    errors.sort()
+    report['failed'] = len(errors)
+    return report
+
+def sync_products_csv(file, allowed_values=None, dry_run=False, chunksize=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Como import_products_csv, em modo de sincronização (sync_products):
+    retorna os totais de inseridos/atualizados/inalterados/falhas e as
+    primeiras SYNC_PREVIEW_LIMIT alterações.
+    """
+    report = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'errors': [], 'changes': []}
+    for chunk in pd.read_csv(file, sep=None, engine='python', dtype=_IMPORT_DTYPES, chunksize=chunksize):
+        if 'nome' not in chunk.columns:
+            raise ValueError("O arquivo CSV deve conter pelo menos a coluna 'nome'.")
+        result = sync_products(chunk, allowed_values, dry_run)
+        for key in ('rows', 'inserted', 'updated', 'unchanged', 'failed'):
+            report[key] += result[key]
+        report['errors'].extend(result['errors'])
+        report['changes'].extend(result['changes'][:SYNC_PREVIEW_LIMIT - len(report['changes'])])
+        if progress:
+            progress(report['rows'])
+    return report
+
+def get_dashboard_summary():
+    """
+    Métricas do dashboard calculadas no banco: estoque e valor em estoque
+    (SUM sobre products) e totais de vendas lidos de sales_summary.
+    """
+    summary = {'total_stock': 0, 'stock_value': 0.0, 'total_sold': 0, 'total_revenue': 0.0, 'sale_count': 0}
+    try:
+        with pooled_connection() as conn:
+            conn.execute("BEGIN")
+            total_stock, stock_value = conn.execute(
+                "SELECT COALESCE(SUM(quantity), 0), COALESCE(SUM(price * quantity), 0) FROM products").fetchone()
+            sales_row = conn.execute(
+                "SELECT sale_count, total_quantity, total_revenue FROM sales_summary WHERE id = 1").fetchone()
+            conn.commit()
+        summary.update(total_stock=total_stock, stock_value=stock_value)
+        if sales_row:
+            summary.update(sale_count=sales_row[0], total_sold=sales_row[1], total_revenue=sales_row[2])
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro ao calcular resumo do dashboard: {e}")
+    return summary
+
+def get_recent_sales(limit=10):
+    """Últimas vendas, mais recentes primeiro (usa o índice de sale_date)."""
+    try:
+        query = '''
+            SELECT s.id, p.name as product_name, s.quantity, s.total_value, s.sale_date, u.name as user_name
+            FROM sales s
+            LEFT JOIN products p ON s.product_id = p.id
+            LEFT JOIN users u ON s.user_id = u.id
+            ORDER BY s.sale_date DESC, s.id DESC
+            LIMIT ?
+        '''
+        with pooled_connection() as conn:
+            return pd.read_sql_query(query, conn, params=(int(limit),))
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro ao buscar últimas vendas: {e}")
+        return pd.DataFrame()
+
+# Campos usados pelo PDV
+_POS_SELECT = "id, sku, name, price, quantity"
+_POS_COLUMNS = ['id', 'sku', 'name', 'price', 'quantity']
+
+def get_product_by_sku(sku):
+    """Busca exata pelo código (leitor de código de barras). Retorna (id, sku, name, price, quantity) ou None."""
+    sku = normalize_sku(sku)
+    if sku is None:
+        return None
+    try:
+        with pooled_connection() as conn:
+            return conn.execute(f"SELECT {_POS_SELECT} FROM products WHERE sku = ?", (sku,)).fetchone()
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro ao buscar produto pelo código: {e}")
+        return None
+
+def search_pos_products(text, limit=20, in_stock_only=True):
+    """
+    Sugestões para o PDV enquanto se digita: primeiro códigos que começam com
+    `text` (faixa no índice único de sku), depois nomes pela busca textual.
+    Retorna só id, sku, name, price e quantity.
+    """
+    text = (text or "").strip()
+    if not text:
+        return pd.DataFrame(columns=_POS_COLUMNS)
+    stock_filter = "AND quantity > 0" if in_stock_only else ""
+    try:
+        with pooled_connection() as conn:
+            by_sku = pd.read_sql_query(
+                f"""SELECT {_POS_SELECT} FROM products
+                    WHERE sku >= ? AND sku < ? {stock_filter}
+                    ORDER BY sku LIMIT ?""",
+                conn, params=(text, text + "\U0010ffff", int(limit)))
+        remaining = int(limit) - len(by_sku)
+        if remaining <= 0:
+            return by_sku
+        
+        by_name = search_products(text, limit=int(limit) * 2)
+        if by_name.empty:
+            return by_sku
+        by_name = by_name[_POS_COLUMNS]
+        if in_stock_only:
+            by_name = by_name[by_name['quantity'] > 0]
+        by_name = by_name[~by_name['id'].isin(by_sku['id'])].head(remaining)
+        if by_sku.empty:
+            return by_name.reset_index(drop=True)
+        return pd.concat([by_sku, by_name], ignore_index=True)
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro na busca do PDV: {e}")
+        return pd.DataFrame(columns=_POS_COLUMNS)
+
+# Leitura do catálogo em fluxo, para relatórios (ver catalog_pdf.py)
+REPORT_CHUNK_SIZE = 500
+_REPORT_ORDER = "COALESCE(p.brand, ''), COALESCE(p.style, ''), p.name COLLATE NOCASE, p.id"
+
+def _iter_report_rows(cursor, chunk_size):
+    columns = PRODUCT_COLUMNS + ['image_hash', 'image_ext']
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for row in rows:
+            item = dict(zip(columns, row))
+            item['image_path'] = _image_file(item['image_hash'], item['image_ext']) if item['image_hash'] else None
+            yield item
+
+@contextmanager
+def catalog_report_cursor(chunk_size=REPORT_CHUNK_SIZE):
+    """
+    Abre uma leitura consistente do catálogo e produz (grupos, linhas):
+    `grupos` é a lista (marca, estilo, quantidade) e `linhas` um iterador de
+    dicts (colunas de PRODUCT_COLUMNS + image_path), na mesma ordem, lidos do
+    cursor em blocos de `chunk_size` — a memória não cresce com o catálogo.
+    """
+    with pooled_connection() as conn:
+        conn.execute("BEGIN")
+        try:
+            groups = conn.execute('''SELECT COALESCE(brand, ''), COALESCE(style, ''), COUNT(*) FROM products
+                                      GROUP BY 1, 2 ORDER BY 1, 2''').fetchall()
+            cursor = conn.execute(f'''SELECT {", ".join("p." + col for col in PRODUCT_COLUMNS)}, i.hash, i.ext
+                                      FROM products p LEFT JOIN images i ON i.hash = p.image_hash
+                                      ORDER BY {_REPORT_ORDER}''')
+            yield groups, _iter_report_rows(cursor, chunk_size)
+        finally:
+            conn.rollback()
+
+# Exportação em fluxo (ver exports.py): linhas lidas do cursor em blocos
+EXPORT_CHUNK_SIZE = 5000
+SALES_EXPORT_COLUMNS = ['id', 'sale_date', 'product_id', 'sku', 'product_name', 'brand',
+                        'quantity', 'total_value', 'user_name']
+
+def _sales_filter(start=None, end=None, product_ids=None):
+    # Período [start, end] em datas (inclusivo) e/ou lista de produtos; usa os índices de sales
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("s.sale_date >= ?")
+        params.append(start.isoformat())
+    if end is not None:
+        clauses.append("s.sale_date < ?")
+        params.append((end + datetime.timedelta(days=1)).isoformat())
+    if product_ids:
+        ids = [int(i) for i in product_ids]
+        clauses.append(f"s.product_id IN ({', '.join('?' * len(ids))})")
+        params.extend(ids)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def count_sales(start=None, end=None, product_ids=None):
+    """Total de vendas no período/produtos (mesmos filtros de sales_export_cursor)."""
+    try:
+        where, params = _sales_filter(start, end, product_ids)
+        with pooled_connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM sales s{where}", params).fetchone()[0]
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro ao contar vendas: {e}")
+        return 0
+
+def _iter_chunks(cursor, chunk_size):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+@contextmanager
+def sales_export_cursor(start=None, end=None, product_ids=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Abre uma leitura consistente das vendas e produz um iterador de blocos
+    (listas de tuplas na ordem de SALES_EXPORT_COLUMNS), por data de venda.
+    `start`/`end` são datas (inclusivas); `product_ids` restringe aos produtos.
+    """
+    where, params = _sales_filter(start, end, product_ids)
+    with pooled_connection() as conn:
+        conn.execute("BEGIN")
+        try:
+            cursor = conn.execute(f'''SELECT s.id, s.sale_date, s.product_id, p.sku, p.name, p.brand,
+                                             s.quantity, s.total_value, u.name
+                                      FROM sales s
+                                      LEFT JOIN products p ON s.product_id = p.id
+                                      LEFT JOIN users u ON s.user_id = u.id{where}
+                                      ORDER BY s.sale_date, s.id''', params)
+            yield _iter_chunks(cursor, chunk_size)
+        finally:
+            conn.rollback()
+
+@contextmanager
+def products_export_cursor(chunk_size=EXPORT_CHUNK_SIZE):
+    """Como sales_export_cursor, para o catálogo (colunas de PRODUCT_COLUMNS, sem imagem)."""
+    with pooled_connection() as conn:
+        conn.execute("BEGIN")
+        try:
+            yield _iter_chunks(conn.execute(f"SELECT {_PRODUCT_SELECT} FROM products ORDER BY id"), chunk_size)
+        finally:
+            conn.rollback()
 
 def get_product_by_id(id):
-    conn = None
+    """Retorna (id, name, brand, style, type, price, quantity, expiration_date, sku), sem a imagem."""
     try:
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("SELECT * FROM products WHERE id=?", (id,))
-        row = c.fetchone()
+        with pooled_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT {_PRODUCT_SELECT} FROM products WHERE id=?", (id,))
+            row = c.fetchone()
         return row
     except Exception as e:
+        perf.note_error(e)
         print(f"Erro ao buscar produto: {e}")
         return None
-    finally:
-        if conn: conn.close()
 
+def _image_cache_get(key):
+    # Retorna (True, valor) se a chave está no cache LRU de imagens
+    with _image_cache_lock:
+        if key in _image_cache:
+            _image_cache.move_to_end(key)
+            return True, _image_cache[key]
+    return False, None
+
+def _image_cache_put(key, image):
+    global _image_cache_bytes
+    with _image_cache_lock:
+        if key not in _image_cache:
+            _image_cache[key] = image
+            _image_cache_bytes += len(image or b"")
+        while _image_cache_bytes > IMAGE_CACHE_MAX_BYTES and len(_image_cache) > 1:
+            _, evicted = _image_cache.popitem(last=False)
+            _image_cache_bytes -= len(evicted or b"")
+
+def _product_image_ref(id):
+    try:
+        with pooled_connection() as conn:
+            return conn.execute('''SELECT i.hash, i.ext FROM products p JOIN images i ON i.hash = p.image_hash
+                                    WHERE p.id = ?''', (int(id),)).fetchone()
+    except Exception as e:
+        perf.note_error(e)
+        print(f"Erro ao buscar imagem do produto: {e}")
+        return None
+
+def get_product_image(id):
+    """Retorna os bytes da imagem do produto (ou None), usando um cache LRU em memória."""
+    ref = _product_image_ref(id)
+    return _read_image(*ref) if ref else None
+
+def get_product_image_path(id):
+    """Caminho do arquivo da imagem do produto no armazenamento (ou None)."""
+    ref = _product_image_ref(id)
+    return _image_file(*ref) if ref else None
+
+# Tempo e linhas de cada função pública vão para o buffer de perf (aba Desempenho)
+perf.instrument_module(sys.modules[__name__], exclude=(
+    'pooled_connection', 'get_connection', 'close_all_connections', 'catalog_report_cursor',
+    'sales_export_cursor', 'products_export_cursor',
+    'normalize_date', 'normalize_sku', 'configure_password_hashing', 'password_needs_rehash',
+    'product_content_hash',
+))
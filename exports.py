@@ -0,0 +1,230 @@
+import os
+import csv
+import time
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import database as db
+import catalog_pdf
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet é opcional: sem pyarrow só há CSV
+    pa = pq = None
+
+# Exportações do catálogo (PDF / CSV)
+# Geradas só quando pedidas, num worker em segundo plano, e guardadas em disco
+# por versão do catálogo: enquanto nenhum produto mudar, baixar de novo não
+# gera nada. O registro de jobs vale para o processo; arquivos de versões
+# anteriores são apagados quando uma nova versão fica pronta.
+# Vendas são exportadas com filtros de período/produto, em CSV ou Parquet.
+# Tudo é lido do cursor em blocos e gravado direto no arquivo, sem DataFrame.
+EXPORT_DIR = Path("cache") / "exports"
+EXPORT_WORKERS = 1
+
+# Colunas do CSV em português (as mesmas aceitas pela importação)
+CSV_COLUMNS = {
+    'name': 'nome', 'brand': 'marca', 'style': 'estilo',
+    'type': 'tipo', 'price': 'preco', 'quantity': 'quantidade',
+    'expiration_date': 'data_validade'
+}
+
+# Colunas da exportação de vendas (database.SALES_EXPORT_COLUMNS) em português
+SALES_COLUMNS = {
+    'id': 'id', 'sale_date': 'data_venda', 'product_id': 'produto_id', 'sku': 'sku',
+    'product_name': 'produto', 'brand': 'marca', 'quantity': 'quantidade',
+    'total_value': 'valor_total', 'user_name': 'vendedor'
+}
+
+SALES_FORMATS = {
+    'csv': {'label': 'CSV', 'mime': 'text/csv'},
+    'parquet': {'label': 'Parquet', 'mime': 'application/vnd.apache.parquet'},
+}
+
+EXPORT_KINDS = {
+    'pdf': {'label': 'PDF', 'ext': 'pdf', 'mime': 'application/pdf', 'file_name': 'produtos.pdf'},
+    'csv': {'label': 'CSV', 'ext': 'csv', 'mime': 'text/csv', 'file_name': 'produtos.csv'},
+}
+
+_jobs = {}  # (banco, tipo) -> job
+_jobs_lock = threading.Lock()
+_executor = None
+
+def _get_executor():
+    global _executor
+    with _jobs_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+        return _executor
+
+def _db_tag():
+    # Um prefixo por banco, para bancos diferentes (ex.: testes) não dividirem arquivos
+    return hashlib.sha1(os.path.abspath(db.DB_NAME).encode('utf-8')).hexdigest()[:8]
+
+def _file_prefix(kind):
+    return f"{_db_tag()}_produtos_{kind}_v"
+
+def build_pdf(path, progress=None):
+    catalog_pdf.generate_catalog_pdf(path, progress=progress)
+
+def write_csv(chunks, columns, path, progress=None, total=None):
+    """
+    Grava os blocos de linhas (listas de tuplas) em CSV com o cabeçalho
+    `columns`, um bloco por vez. Retorna o número de linhas gravadas.
+    """
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            written += len(rows)
+            if progress and total:
+                progress(written / total)
+    return written
+
+def _sales_schema():
+    return pa.schema([
+        ('id', pa.int64()), ('data_venda', pa.string()), ('produto_id', pa.int64()), ('sku', pa.string()),
+        ('produto', pa.string()), ('marca', pa.string()), ('quantidade', pa.int64()),
+        ('valor_total', pa.float64()), ('vendedor', pa.string()),
+    ])
+
+def write_parquet(chunks, schema, path, progress=None, total=None):
+    """Como write_csv, em Parquet: cada bloco vira um row group (requer pyarrow)."""
+    if pq is None:
+        raise RuntimeError("Exportação em Parquet requer o pacote pyarrow")
+    written = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            written += len(rows)
+            if progress and total:
+                progress(written / total)
+    return written
+
+def parquet_available():
+    return pq is not None
+
+def export_sales(path, fmt='csv', start=None, end=None, product_ids=None, progress=None):
+    """
+    Exporta as vendas do período [start, end] (datas, inclusivas) e dos
+    produtos `product_ids` (todos, se vazio) para `path`, lendo o banco em
+    blocos: a memória não cresce com o histórico. Retorna as linhas gravadas.
+    """
+    total = db.count_sales(start, end, product_ids) if progress else None
+    columns = [SALES_COLUMNS[col] for col in db.SALES_EXPORT_COLUMNS]
+    with db.sales_export_cursor(start, end, product_ids) as chunks:
+        if fmt == 'parquet':
+            return write_parquet(chunks, _sales_schema(), path, progress, total)
+        return write_csv(chunks, columns, path, progress, total)
+
+def sales_export_path(fmt, start=None, end=None, product_ids=None):
+    """Arquivo da exportação de vendas com esses filtros (um por banco e filtro)."""
+    key = f"{start}|{end}|{sorted(int(i) for i in product_ids or [])}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
+    return EXPORT_DIR / f"{_db_tag()}_vendas_{digest}.{fmt}"
+
+def build_sales_export(fmt='csv', start=None, end=None, product_ids=None, progress=None):
+    """
+    Gera a exportação de vendas em EXPORT_DIR (apagando as anteriores deste
+    banco) e retorna (caminho, linhas).
+    """
+    path = sales_export_path(fmt, start, end, product_ids)
+    prefix = f"{_db_tag()}_vendas_"
+    tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        rows = export_sales(tmp_path, fmt, start, end, product_ids, progress)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    for old in EXPORT_DIR.glob(f"{prefix}*"):
+        if old != path and not old.name.endswith(".tmp"):
+            try:
+                old.unlink()
+            except OSError:
+                pass
+    return path, rows
+
+def build_csv(path, progress=None):
+    columns = [CSV_COLUMNS.get(col, col) for col in db.PRODUCT_COLUMNS]
+    total = db.count_products()
+    with db.products_export_cursor() as chunks:
+        write_csv(chunks, columns, path, progress, total)
+
+_BUILDERS = {'pdf': build_pdf, 'csv': build_csv}
+
+def _run_job(job):
+    kind = job['kind']
+    prefix = _file_prefix(kind)
+    path = EXPORT_DIR / f"{prefix}{job['version']}.{EXPORT_KINDS[kind]['ext']}"
+    tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    start = time.perf_counter()
+    try:
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+
+        def progress(fraction):
+            job['progress'] = max(0.0, min(float(fraction), 1.0))
+
+        _BUILDERS[kind](tmp_path, progress)
+        os.replace(tmp_path, path)
+        job.update(path=str(path), progress=1.0, seconds=round(time.perf_counter() - start, 2), status='done')
+
+        for old in EXPORT_DIR.glob(f"{prefix}*"):
+            if old != path and not old.name.endswith(".tmp"):
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+    except Exception as e:
+        print(f"Erro ao gerar exportação {kind}: {e}")
+        job.update(status='error', error=str(e))
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def get_export(kind):
+    """
+    Job de exportação do catálogo atual, ou None se ainda não foi pedido.
+    Um job em andamento é devolvido mesmo se o catálogo mudou no meio.
+    """
+    with _jobs_lock:
+        job = _jobs.get((db.DB_NAME, kind))
+    if job is None:
+        return None
+    if job['status'] == 'running' or job['version'] == db.get_catalog_version():
+        return job
+    return None
+
+def request_export(kind):
+    """Inicia (se preciso) a exportação da versão atual do catálogo e retorna o job."""
+    version = db.get_catalog_version()
+    key = (db.DB_NAME, kind)
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job and job['status'] == 'running':
+            return job
+        if job and job['status'] == 'done' and job['version'] == version and os.path.exists(job['path']):
+            return job
+        job = {'kind': kind, 'version': version, 'status': 'running', 'progress': 0.0,
+               'path': None, 'error': None, 'seconds': None}
+        _jobs[key] = job
+    _get_executor().submit(_run_job, job)
+    return job
+
+def any_running():
+    with _jobs_lock:
+        return any(job['status'] == 'running' for job in _jobs.values())
+
+def read_export(job):
+    with open(job['path'], "rb") as f:
+        return f.read()
@@ -0,0 +1,233 @@
+import os
+import time
+import sqlite3
+import json
+import inspect
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+import pandas as pd
+
+# Instrumentação de desempenho
+# Cada chamada medida vira um evento num buffer circular do processo (todas as
+# sessões), resumido na aba "Desempenho" do admin. As conexões do banco usam
+# TracedConnection, que soma o tempo gasto executando SQL em cada chamada
+# medida; quando esse tempo passa de SLOW_QUERY_MS o evento guarda também os
+# comandos mais lentos (o texto com "?", nunca os valores).
+PERF_ENABLED = os.environ.get("PERF_ENABLED", "1") != "0"
+PERF_BUFFER_SIZE = int(os.environ.get("PERF_BUFFER_SIZE", 5000))
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 200))
+SLOW_SQL_MAX_STATEMENTS = 10
+SLOW_SQL_MAX_CHARS = 1000
+SQL_MAX_DISTINCT = 50  # comandos distintos acompanhados por chamada
+# Controle de transação não explica lentidão: não entra no SQL capturado
+_TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'END', 'SAVEPOINT', 'RELEASE')
+
+_events = deque(maxlen=PERF_BUFFER_SIZE)
+_local = threading.local()
+
+def _count_rows(result):
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        for key in ('imported', 'rows'):
+            if isinstance(result.get(key), int):
+                return result[key]
+    return None
+
+def record(kind, name, ms, rows=None, error=None, sql=None, sql_ms=None):
+    """Adiciona um evento ao buffer."""
+    event = {'ts': time.time(), 'kind': kind, 'name': name, 'ms': round(ms, 3),
+             'rows': rows, 'error': error, 'thread': threading.current_thread().name}
+    if sql_ms is not None:
+        event['sql_ms'] = round(sql_ms, 3)
+    if sql:
+        event['sql'] = sql
+    _events.append(event)
+
+def _current_frame():
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+def _note_sql(frame, sql, ms):
+    frame['sql_ms'] += ms
+    if sql.lstrip()[:9].upper().startswith(_TRANSACTION_STATEMENTS):
+        return
+    key = " ".join(sql.split())[:SLOW_SQL_MAX_CHARS]
+    stats = frame['sql'].get(key)
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += ms
+    elif len(frame['sql']) < SQL_MAX_DISTINCT:
+        frame['sql'][key] = [1, ms]
+
+def note_error(error):
+    """Marca a chamada medida atual como falha (para funções que tratam a exceção e seguem)."""
+    frame = _current_frame()
+    if frame is not None and frame['error'] is None:
+        frame['error'] = f"{type(error).__name__}: {error}"
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor que, dentro de uma chamada medida, soma o tempo de execute/executemany."""
+    def execute(self, sql, parameters=()):
+        frame = _current_frame()
+        if frame is None:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _note_sql(frame, sql, (time.perf_counter() - start) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        frame = _current_frame()
+        if frame is None:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _note_sql(frame, sql, (time.perf_counter() - start) * 1000)
+
+class TracedConnection(sqlite3.Connection):
+    """Fábrica de conexão (sqlite3.connect(factory=...)) cujos cursores são TracedCursor."""
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def _slowest_sql(frame):
+    ranked = sorted(frame['sql'].items(), key=lambda item: item[1][1], reverse=True)
+    return [f"-- {ms:.1f} ms, {count}x\n{sql}" for sql, (count, ms) in ranked[:SLOW_SQL_MAX_STATEMENTS]]
+
+@contextmanager
+def _measure(kind, name):
+    stack = _local.__dict__.setdefault('stack', [])
+    frame = {'rows': None, 'sql': {}, 'sql_ms': 0.0, 'error': None}
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield frame
+    except Exception as e:
+        note_error(e)
+        raise
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        stack.pop()
+        if stack:
+            # Chamada aninhada: o SQL também conta para a chamada de fora
+            outer = stack[-1]
+            outer['sql_ms'] += frame['sql_ms']
+            for sql, (count, sql_ms) in frame['sql'].items():
+                stats = outer['sql'].get(sql)
+                if stats is not None:
+                    stats[0] += count
+                    stats[1] += sql_ms
+                elif len(outer['sql']) < SQL_MAX_DISTINCT:
+                    outer['sql'][sql] = [count, sql_ms]
+        # Lento pelo tempo de SQL (não pelo bcrypt de um login, por exemplo);
+        # SQL só nos eventos de banco, nas views o tempo raramente é do SQL
+        is_db = kind == 'db'
+        slow_sql = _slowest_sql(frame) if is_db and frame['sql_ms'] >= SLOW_QUERY_MS else None
+        record(kind, name, ms, frame['rows'], frame['error'], slow_sql, frame['sql_ms'] if is_db else None)
+        if slow_sql:
+            print(f"Consulta lenta ({frame['sql_ms']:.0f} ms de SQL) em {name}: {slow_sql[0].splitlines()[-1]}")
+
+@contextmanager
+def section(name, kind='view'):
+    """Mede um trecho de código (ex.: uma seção de uma view)."""
+    if not PERF_ENABLED:
+        yield {}
+        return
+    with _measure(kind, name) as state:
+        yield state
+
+def timed(name=None, kind='db'):
+    """Decorador que mede a função (e, em geradores, toda a iteração)."""
+    def decorator(fn):
+        label = name or f"{fn.__module__}.{fn.__name__}"
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                if not PERF_ENABLED:
+                    yield from fn(*args, **kwargs)
+                    return
+                with _measure(kind, label) as state:
+                    count = 0
+                    for item in fn(*args, **kwargs):
+                        count += 1
+                        yield item
+                    state['rows'] = count
+            gen_wrapper.__perf_wrapped__ = True
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not PERF_ENABLED:
+                return fn(*args, **kwargs)
+            with _measure(kind, label) as state:
+                result = fn(*args, **kwargs)
+                state['rows'] = _count_rows(result)
+                return result
+        wrapper.__perf_wrapped__ = True
+        return wrapper
+    return decorator
+
+def instrument_module(module, exclude=(), kind='db'):
+    """
+    Troca as funções públicas definidas em `module` por versões medidas.
+    As chamadas internas do módulo passam pelos globais, então também são medidas.
+    """
+    prefix = module.__name__.rsplit('.', 1)[-1]
+    for attr, fn in list(vars(module).items()):
+        if attr.startswith('_') or attr in exclude:
+            continue
+        if not inspect.isfunction(fn) or fn.__module__ != module.__name__ or getattr(fn, '__perf_wrapped__', False):
+            continue
+        setattr(module, attr, timed(f"{prefix}.{attr}", kind)(fn))
+
+def get_events(kind=None):
+    events = list(_events)
+    if kind:
+        events = [e for e in events if e['kind'] == kind]
+    return events
+
+def clear():
+    _events.clear()
+
+def summary():
+    """p50/p95/máximo por operação, ordenado pelo tempo total."""
+    columns = ['kind', 'name', 'count', 'p50_ms', 'p95_ms', 'max_ms', 'total_ms', 'avg_rows', 'errors', 'slow']
+    events = get_events()
+    if not events:
+        return pd.DataFrame(columns=columns)
+    df = pd.DataFrame(events)
+    df['is_error'] = df['error'].notna()
+    # Lenta = tempo de SQL acima do limite (o mesmo critério de slow_events)
+    df['is_slow'] = df['sql'].notna() if 'sql' in df else False
+    grouped = df.groupby(['kind', 'name'])
+    result = pd.DataFrame({
+        'count': grouped['ms'].size(),
+        'p50_ms': grouped['ms'].quantile(0.5),
+        'p95_ms': grouped['ms'].quantile(0.95),
+        'max_ms': grouped['ms'].max(),
+        'total_ms': grouped['ms'].sum(),
+        'avg_rows': grouped['rows'].apply(lambda s: pd.to_numeric(s, errors='coerce').mean()),
+        'errors': grouped['is_error'].sum(),
+        'slow': grouped['is_slow'].sum(),
+    }).reset_index()
+    return result.sort_values('total_ms', ascending=False).round(2)[columns].reset_index(drop=True)
+
+def slow_events():
+    return [e for e in get_events() if e.get('sql')]
+
+def export_jsonl():
+    """Eventos do buffer em JSON lines (bytes), para download."""
+    return "".join(json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in get_events()).encode('utf-8')
@@ -0,0 +1,43 @@
+import datetime
+
+import pytest
+
+import database as db
+
+# Aniversariantes (get_birthday_clients): filtro por mês/dia a partir de `today`,
+# com 29/02 comemorado em 28/02 nos anos não bissextos.
+
+
+@pytest.fixture
+def clients(scratch_db):
+    rounds = db.BCRYPT_ROUNDS
+    db.configure_password_hashing(rounds=4)  # bcrypt rápido: o hash não importa aqui
+    for username, birth_date in [("ana", "1990-03-15"), ("bia", "1985-03-18"), ("caio", "2000-02-29"),
+                                 ("davi", "20/03/1995"), ("eva", "1992-07-01")]:
+        assert db.create_user(username, "senha", "cliente", username.title(), birth_date)
+    db.create_user("func", "senha", "funcionario", "Func", "1990-03-15")
+    yield
+    db.configure_password_hashing(rounds=rounds)
+
+
+def _names(days, today):
+    df = db.get_birthday_clients(days=days, today=today)
+    return list(zip(df['name'], df['days_until']))
+
+
+def test_birthday_today_and_within_window(clients):
+    today = datetime.date(2025, 3, 15)
+    assert _names(0, today) == [("Ana", 0)]
+    assert _names(3, today) == [("Ana", 0), ("Bia", 3)]
+
+
+def test_leap_day_birthday_on_feb_28_of_common_year(clients):
+    assert _names(0, datetime.date(2025, 2, 28)) == [("Caio", 0)]
+    assert _names(0, datetime.date(2024, 2, 28)) == []
+    assert _names(0, datetime.date(2024, 2, 29)) == [("Caio", 0)]
+
+
+def test_brazilian_birth_date_from_create_user(clients):
+    df = db.get_birthday_clients(days=0, today=datetime.date(2025, 3, 20))
+    assert df['name'].tolist() == ["Davi"]
+    assert df['birth_date'].tolist() == ["1995-03-20"]
@@ -0,0 +1,37 @@
+import pytest
+
+import database as db
+
+# Venda do carrinho (register_sales_batch): tudo ou nada numa única transação.
+
+
+@pytest.fixture
+def products(scratch_db):
+    db.add_product("Batom", "Avon", "Make", "Boca", 10.0, 5, "2030-01-01", None)
+    db.add_product("Perfume", "Natura", "Perfume", "Corpo", 99.9, 2, "2030-01-01", None)
+    return 1, 2
+
+
+def _stock(product_id):
+    return db.get_product_by_id(product_id)[6]
+
+
+def test_cart_sale_records_every_item(products):
+    batom, perfume = products
+    ok, _, results = db.register_sales_batch([(batom, 3), (perfume, 2)], user_id=1)
+
+    assert ok and all(r['ok'] for r in results)
+    assert (_stock(batom), _stock(perfume)) == (2, 0)
+    summary = db.get_dashboard_summary()
+    assert (summary['sale_count'], summary['total_sold']) == (2, 5)
+    assert summary['total_revenue'] == pytest.approx(3 * 10.0 + 2 * 99.9)
+
+
+def test_cart_sale_is_all_or_nothing(products):
+    batom, perfume = products
+    ok, _, results = db.register_sales_batch([(batom, 1), (perfume, 3), (999, 1)])
+
+    assert not ok
+    assert [r['message'] for r in results] == ["OK", "Estoque insuficiente", "Produto não encontrado"]
+    assert (_stock(batom), _stock(perfume)) == (5, 2)
+    assert db.get_dashboard_summary()['sale_count'] == 0
@@ -0,0 +1,80 @@
+import multiprocessing
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import database as db
+
+# Vendas simultâneas contra um único store.db: o estoque nunca pode ficar
+# negativo e cada unidade vendida deve ter exatamente uma linha em sales.
+
+STOCK = 150
+THREADS = 16
+THREAD_ATTEMPTS = 400
+PROCESSES = 4
+PROCESS_ATTEMPTS = 100
+
+
+@pytest.fixture
+def stock_db(scratch_db):
+    # Um único produto com estoque STOCK
+    db.add_product("Produto Concorrência", "Avon", "Make", "Boca", 2.5, STOCK, "2030-01-01", None)
+    product_id = int(db.get_products_page(1, 1, "Concorrência")['id'].iloc[0])
+    return scratch_db, product_id
+
+
+def _check_consistency(path, product_id, successes):
+    conn = sqlite3.connect(str(path))
+    try:
+        stock = conn.execute("SELECT quantity FROM products WHERE id = ?", (product_id,)).fetchone()[0]
+        sold, revenue = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(total_value), 0) FROM sales WHERE product_id = ?", (product_id,)).fetchone()
+        summary = conn.execute("SELECT sale_count, total_quantity FROM sales_summary WHERE id = 1").fetchone()
+    finally:
+        conn.close()
+    assert stock >= 0
+    assert successes == STOCK
+    assert stock == 0
+    assert sold == STOCK
+    assert revenue == STOCK * 2.5
+    assert summary == (STOCK, STOCK)
+
+
+def _process_worker(args):
+    path, product_id, attempts = args
+    db.DB_NAME = path
+    return sum(1 for _ in range(attempts) if db.register_sale(product_id, 1, None)[0])
+
+
+def test_threads_never_oversell(stock_db):
+    path, product_id = stock_db
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(lambda _: db.register_sale(product_id, 1, None)[0], range(THREAD_ATTEMPTS)))
+    elapsed = time.perf_counter() - start
+    
+    _check_consistency(path, product_id, sum(results))
+    print(f"threads: {THREAD_ATTEMPTS} tentativas em {elapsed:.3f}s ({THREAD_ATTEMPTS / elapsed:.0f} vendas/s)")
+
+
+def test_processes_never_oversell(stock_db):
+    path, product_id = stock_db
+    db.close_all_connections()
+    
+    ctx = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    with ctx.Pool(PROCESSES) as pool:
+        results = pool.map(_process_worker, [(str(path), product_id, PROCESS_ATTEMPTS)] * PROCESSES)
+    elapsed = time.perf_counter() - start
+    
+    attempts = PROCESSES * PROCESS_ATTEMPTS
+    _check_consistency(path, product_id, sum(results))
+    print(f"processos: {attempts} tentativas em {elapsed:.3f}s ({attempts / elapsed:.0f} vendas/s, inclui subir os processos)")
+
+
+if __name__ == "__main__":
+    # Mostra as taxas de vendas/s
+    raise SystemExit(pytest.main([__file__, "-q", "-s"]))
@@ -0,0 +1,48 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+import database as db
+import exports
+
+# Exportação de vendas em fluxo: filtros de período/produto e os dois formatos
+# devem produzir as mesmas linhas, com as colunas em português.
+
+
+@pytest.fixture
+def sales_db(scratch_db):
+    db.add_product("Batom Ação", "Avon", "Make", "Boca", 10.0, 100, "2030-01-01", None)
+    db.add_product("Perfume Coração", "Natura", "Perfume", "Corpo", 99.9, 100, "2030-01-01", None)
+    ids = sorted(int(i) for i in db.get_products(columns=['id'])['id'])
+    with db.pooled_connection() as conn:
+        rows = [(ids[i % 2], 1, 10.0, f"2025-01-{day:02d} 12:00:00") for i, day in enumerate(range(1, 31))]
+        conn.executemany("INSERT INTO sales (product_id, quantity, total_value, sale_date) VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+    return ids
+
+
+def _read(path, fmt):
+    return pd.read_parquet(path) if fmt == 'parquet' else pd.read_csv(path)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_export_sales_filters(sales_db, tmp_path, fmt):
+    if fmt == 'parquet' and not exports.parquet_available():
+        pytest.skip("pyarrow não instalado")
+    path = tmp_path / f"vendas.{fmt}"
+    start, end = datetime.date(2025, 1, 10), datetime.date(2025, 1, 19)
+
+    rows = exports.export_sales(path, fmt, start, end, [sales_db[1]])
+    df = _read(path, fmt)
+
+    assert rows == len(df) == 5
+    assert list(df.columns) == [exports.SALES_COLUMNS[col] for col in db.SALES_EXPORT_COLUMNS]
+    assert set(df['produto']) == {"Perfume Coração"}
+    assert df['data_venda'].min() >= "2025-01-10" and df['data_venda'].max() < "2025-01-20"
+
+
+def test_export_sales_all_rows(sales_db, tmp_path):
+    path = tmp_path / "vendas.csv"
+    assert exports.export_sales(path) == db.count_sales() == 30
+    assert len(pd.read_csv(path)) == 30
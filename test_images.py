@@ -0,0 +1,64 @@
+import io
+import os
+import sqlite3
+
+from PIL import Image
+
+import database as db
+
+# Armazenamento de imagens por conteúdo: bytes iguais viram um único arquivo,
+# o refcount acompanha produtos e usuários, e as imagens sem uso são apagadas.
+
+
+def _png(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (4, 4), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _refcounts():
+    with db.pooled_connection() as conn:
+        return dict(conn.execute("SELECT hash, refcount FROM images"))
+
+
+def test_same_image_is_stored_once(scratch_db):
+    red, blue = _png("red"), _png("blue")
+    db.add_product("Batom", "Avon", "Make", "Boca", 10.0, 5, "2030-01-01", red)
+    db.add_product("Perfume", "Natura", "Perfume", "Corpo", 99.9, 2, "2030-01-01", red)
+
+    path = db.get_product_image_path(1)
+    assert path == db.get_product_image_path(2) and os.path.exists(path)
+    assert db.get_product_image(2) == red
+    assert list(_refcounts().values()) == [2]
+
+    db.delete_product(1)
+    db.update_product(2, "Perfume", "Natura", "Perfume", "Corpo", 99.9, 2, "2030-01-01", blue)
+    assert sorted(_refcounts().values()) == [0, 1]
+    assert db.collect_unused_images() == 1
+    assert not os.path.exists(path)
+    assert db.get_product_image(2) == blue
+
+
+def test_legacy_blobs_move_to_the_store(legacy_db, tmp_path):
+    with sqlite3.connect(str(legacy_db)) as conn:
+        conn.execute("INSERT INTO products (name, price, quantity, image) VALUES ('Batom', 10.0, 5, ?)", (_png("red"),))
+
+    db.init_db()
+    assert db.get_product_image(1) == _png("red")
+    assert db.get_product_image_path(1).startswith(str(tmp_path / db.IMAGE_STORE_DIRNAME))
+    with db.pooled_connection() as conn:
+        assert conn.execute("SELECT image FROM products WHERE id = 1").fetchone()[0] is None
+
+
+def test_file_from_rolled_back_transaction_is_swept(scratch_db):
+    with db.pooled_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        db._store_image(conn, _png("green"))
+        conn.rollback()
+    (path,) = [os.path.join(root, name) for root, _, files in os.walk(db._image_store_dir()) for name in files]
+
+    assert db.collect_unused_images() == 0 and os.path.exists(path)  # ainda no prazo de carência
+    old = os.path.getmtime(path) - db.ORPHAN_IMAGE_GRACE_SECONDS - 1
+    os.utime(path, (old, old))
+    assert db.collect_unused_images() == 1
+    assert not os.path.exists(path)
@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+import database as db
+
+# Importação em massa (modo "Importar tudo"): linhas sem id são inseridas,
+# linhas com id sobrescrevem o produto, e nenhum erro apaga outro produto.
+
+
+@pytest.fixture
+def catalog(scratch_db):
+    db.add_product("Batom", "Avon", "Make", "Boca", 10.0, 5, "2030-01-01", None, sku="X1")
+    db.add_product("Perfume", "Natura", "Perfume", "Corpo", 99.9, 2, "2030-01-01", None, sku="X3")
+    db.register_sale(1, 1)
+
+
+def _import(text):
+    return db.import_products_csv(io.StringIO(text))
+
+
+def test_import_inserts_and_overwrites_by_id(catalog):
+    report = _import("id;nome;preco;quantidade;data_validade;sku\n;Novo;5;3;31/12/2030;0123\n2;Perfume Novo;80;4;;X3\n")
+
+    assert report == {'imported': 2, 'failed': 0, 'errors': []}
+    assert db.get_product_by_id(2)[1:] == ("Perfume Novo", "Outra", "Outro", "Outro", 80.0, 4, None, "X3")
+    assert db.count_products() == 3
+    assert db.get_product_by_sku("0123")[2] == "Novo"
+    assert db.get_product_by_id(db.get_product_by_sku("0123")[0])[7] == "2030-12-31"
+
+
+def test_mixed_ids_with_sku_collision_never_delete_products(catalog):
+    # Linha sem id com o SKU do produto 1 e linha com id novo com o SKU do produto 2
+    report = _import("id;nome;sku\n;B;X1\n7;D;X3\n;E;X9\n")
+
+    assert report['imported'] == 1
+    assert [(line, name) for line, name, _ in report['errors']] == [(2, 'B'), (3, 'D')]
+    assert db.get_product_by_id(1)[1] == "Batom"
+    assert db.get_product_by_id(2)[1] == "Perfume"
+    assert db.get_product_by_id(7) is None
+    with db.pooled_connection() as conn:
+        orphans = conn.execute("SELECT COUNT(*) FROM sales s LEFT JOIN products p ON p.id = s.product_id "
+                               "WHERE p.id IS NULL").fetchone()[0]
+    assert orphans == 0
@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+import database as db
+
+# Migrações versionadas: um banco antigo (só o esquema original, user_version 0)
+# sobe até SCHEMA_VERSION sem perder dados, e rodar de novo não faz nada.
+
+
+def test_legacy_database_is_upgraded_once(legacy_db):
+    with sqlite3.connect(str(legacy_db)) as conn:
+        conn.execute("INSERT INTO products (name, brand, style, type, price, quantity, expiration_date) "
+                     "VALUES ('Fragrância Floral', 'Natura', 'Perfume', 'Corpo', 50.0, 4, '2030-01-01')")
+        conn.execute("INSERT INTO sales (product_id, quantity, total_value) VALUES (1, 2, 100.0)")
+
+    assert db.migrate() == list(range(1, db.SCHEMA_VERSION + 1))
+    assert db.get_schema_version() == db.SCHEMA_VERSION
+    assert db.migrate() == []
+
+    assert db.get_product_by_id(1)[1] == "Fragrância Floral"
+    assert db.search_products("fragrancia")['id'].tolist() == [1]
+    summary = db.get_dashboard_summary()
+    assert (summary['sale_count'], summary['total_sold'], summary['total_revenue']) == (1, 2, 100.0)
+
+
+def test_fresh_database_starts_at_current_version(scratch_db):
+    assert db.get_schema_version() == db.SCHEMA_VERSION
+    assert db.migrate() == []
+
+
+def test_failed_startup_raises_and_can_be_retried(legacy_db, monkeypatch):
+    def broken(c):
+        raise sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(db, "MIGRATIONS", db.MIGRATIONS[:3] + [broken] + db.MIGRATIONS[4:])
+
+    with pytest.raises(sqlite3.OperationalError):
+        db.init_db()
+    assert db.get_schema_version() == 3
+
+    monkeypatch.undo()
+    monkeypatch.setattr(db, "DB_NAME", str(legacy_db))
+    db.init_db()
+    assert db.get_schema_version() == db.SCHEMA_VERSION
+    assert db.check_login("admin", "admin123")
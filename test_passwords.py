@@ -0,0 +1,33 @@
+import pytest
+
+import database as db
+
+# Hashes com custo diferente de BCRYPT_ROUNDS são refeitos no próximo login certo.
+
+
+@pytest.fixture
+def rounds(scratch_db):
+    original = db.BCRYPT_ROUNDS
+    yield db.configure_password_hashing
+    db.configure_password_hashing(rounds=original)
+
+
+def _stored_hash(username):
+    with db.pooled_connection() as conn:
+        return conn.execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()[0]
+
+
+def test_login_rehashes_with_current_rounds(rounds):
+    rounds(rounds=5)
+    assert db.create_user("ana", "segredo", "cliente", "Ana")
+    old_hash = _stored_hash("ana")
+    assert old_hash.startswith("$2b$05$")
+
+    rounds(rounds=4)
+    assert db.check_login("ana", "errada") is None
+    assert _stored_hash("ana") == old_hash
+
+    user = db.check_login("ana", "segredo")
+    assert user.username == "ana"
+    assert _stored_hash("ana").startswith("$2b$04$")
+    assert db.check_login("ana", "segredo") is not None
@@ -0,0 +1,84 @@
+import io
+
+import pytest
+
+import database as db
+
+# Sincronização incremental: só o que mudou é gravado, a imagem e as colunas
+# ausentes do CSV são preservadas, e o modo de pré-visualização não grava nada.
+
+HEADER = "id;nome;marca;estilo;tipo;preco;quantidade;data_validade;sku\n"
+
+
+@pytest.fixture
+def catalog(scratch_db):
+    db.add_product("Batom", "Avon", "Make", "Boca", 10.0, 5, "2030-01-01", None, sku="0001")
+    db.add_product("Perfume", "Natura", "Perfume", "Corpo", 99.9, 2, "2030-01-01", None, sku="0002")
+    with db.pooled_connection() as conn:
+        conn.execute("UPDATE products SET image_hash = 'abc' WHERE sku = '0001'")
+        conn.commit()
+
+
+def _sync(text, dry_run=False):
+    return db.sync_products_csv(io.StringIO(text), dry_run=dry_run)
+
+
+def _counts(report):
+    return {k: report[k] for k in ('inserted', 'updated', 'unchanged', 'failed')}
+
+
+def test_sync_only_touches_changed_rows(catalog):
+    batom, perfume = db.get_product_by_id(1), db.get_product_by_id(2)
+    feed = HEADER + "1;Batom;Avon;Make;Boca;12.5;5;2030-01-01;0001\n2;Perfume;Natura;Perfume;Corpo;99.9;2;2030-01-01;0002\n"
+
+    preview = _sync(feed, dry_run=True)
+    assert _counts(preview) == {'inserted': 0, 'updated': 1, 'unchanged': 1, 'failed': 0}
+    assert preview['changes'] == [(2, 1, 'Batom', 'atualizar', 'preco: 10.0 → 12.5')]
+    assert db.get_product_by_id(1) == batom
+
+    version = db.get_catalog_version()
+    assert _counts(_sync(feed)) == {'inserted': 0, 'updated': 1, 'unchanged': 1, 'failed': 0}
+    assert db.get_product_by_id(1)[5] == 12.5
+    assert db.get_product_by_id(2) == perfume
+    assert db.get_catalog_version() > version
+    with db.pooled_connection() as conn:
+        assert conn.execute("SELECT image_hash FROM products WHERE id = 1").fetchone()[0] == 'abc'
+
+    version = db.get_catalog_version()
+    assert _counts(_sync(feed)) == {'inserted': 0, 'updated': 0, 'unchanged': 2, 'failed': 0}
+    assert db.get_catalog_version() == version
+
+
+def test_sync_matches_by_sku_and_keeps_missing_columns(catalog):
+    report = _sync("nome;sku;quantidade\nPerfume;0002;7\nNovo;0003;1\n")
+    assert _counts(report) == {'inserted': 1, 'updated': 1, 'unchanged': 0, 'failed': 0}
+    assert db.get_product_by_id(2)[1:] == ("Perfume", "Natura", "Perfume", "Corpo", 99.9, 7, "2030-01-01", "0002")
+
+
+def test_sale_after_sync_is_detected(catalog):
+    feed = HEADER + "2;Perfume;Natura;Perfume;Corpo;99.9;2;2030-01-01;0002\n"
+    db.register_sale(2, 1)
+    assert _counts(_sync(feed)) == {'inserted': 0, 'updated': 1, 'unchanged': 0, 'failed': 0}
+    assert db.get_product_by_id(2)[6] == 2
+
+
+def test_mixed_id_file_matches_blank_ids_by_sku(catalog):
+    report = _sync("id;nome;sku;quantidade\n;Batom;0001;9\n2;Perfume;0002;2\n;Novo;0003;1\n")
+
+    assert _counts(report) == {'inserted': 1, 'updated': 1, 'unchanged': 1, 'failed': 0}
+    assert [(line, row_id, action) for line, row_id, _, action, _ in report['changes']] == [
+        (2, 1, 'atualizar'), (4, db.get_product_by_sku("0003")[0], 'inserir')]
+    assert db.get_product_by_id(1)[6] == 9
+
+
+def test_product_without_sku_is_unchanged_after_a_sale(catalog):
+    db.add_product("Sabonete", "Natura", "Corpo", "Corpo", 5.0, 10, "2030-01-01", None)
+    db.register_sale(3, 1)  # zera o content_hash: a comparação passa a ser pelos valores
+    feed = HEADER + "3;Sabonete;Natura;Corpo;Corpo;5.0;9;2030-01-01;\n"
+    version = db.get_catalog_version()
+
+    report = _sync(feed, dry_run=True)
+    assert _counts(report) == {'inserted': 0, 'updated': 0, 'unchanged': 1, 'failed': 0}
+    assert report['changes'] == []
+    assert _counts(_sync(feed))['unchanged'] == 1
+    assert db.get_catalog_version() == version
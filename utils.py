@@ -1,5 +1,6 @@
 import streamlit as st
 import base64
+import database as db
 
 # Constantes do Sistema
 MARCAS = [
@@ -42,36 +43,171 @@ COLOR_TEXT_LARGE_1 = "#800020"
 COLOR_TEXT_LARGE_2 = "#36454F"
 
 import os
+import io
+import hashlib
+import threading
 from pathlib import Path
 
+ASSETS_DIR = Path("assets")
+
+# Índice id do produto -> arquivo em assets/ ('{id}_*'), reconstruído quando o
+# mtime do diretório muda (arquivo adicionado, removido ou renomeado)
+_asset_index = {'mtime': None, 'files': {}}
+_asset_index_lock = threading.Lock()
+
+def get_asset_index():
+    """Retorna o mapa {'<id>': caminho} das imagens de produto em assets/."""
+    try:
+        mtime = ASSETS_DIR.stat().st_mtime_ns
+    except OSError:
+        return {}
+    
+    with _asset_index_lock:
+        if _asset_index['mtime'] != mtime:
+            files = {}
+            for f in sorted(os.listdir(ASSETS_DIR)):
+                prefix, sep, _ = f.partition("_")
+                if sep and prefix.isdigit():
+                    files.setdefault(prefix, str(ASSETS_DIR / f))
+            _asset_index.update(mtime=mtime, files=files)
+        return _asset_index['files']
+
 def get_product_image_source(product_row):
     """
     Returns the image source for st.image.
-    Prioritizes file in 'assets/' with name '{id}_*', then database blob.
+    Prioritizes the content-addressed image store, then a file in 'assets/'
+    named '{id}_*' (added after the migration to the store).
     """
-    # Try assets first
+    # Armazenamento por conteúdo (o catálogo não traz a imagem, só has_image)
+    if product_row.get('has_image'):
+        image_path = db.get_product_image_path(product_row['id'])
+        if image_path:
+            return image_path
+    
+    return get_asset_index().get(str(product_row['id']))
+
+# Miniaturas
+# Geradas na primeira requisição e gravadas em disco com nome
+# '{sha256 do original}_{lado}.{ext}', então conteúdo igual reaproveita o arquivo.
+THUMBNAIL_DIR = Path("cache") / "thumbnails"
+THUMBNAIL_SIZES = {'small': 160, 'medium': 320, 'large': 640}
+THUMBNAIL_QUALITY = 80
+
+# (caminho, mtime, tamanho, bucket) -> miniatura, evita reler/hashear arquivos de assets/
+_thumbnail_memo = {}
+
+def _default_thumbnail_format():
     try:
-        assets_path = Path("assets")
-        if assets_path.exists():
-            # List matching files
-            # Optimization: This listing happens every time. In high load, cache this list.
-            # For this app size, it's okay.
-            for f in os.listdir(assets_path):
-                if f.startswith(f"{product_row['id']}_"):
-                    return str(assets_path / f)
+        from PIL import features
+        return "WEBP" if features.check("webp") else "JPEG"
     except Exception:
-        pass
+        return "JPEG"
+
+THUMBNAIL_FORMAT = _default_thumbnail_format()
+
+def thumbnail_path(digest, size='medium', fmt=None):
+    """Caminho da miniatura de uma imagem a partir do SHA-256 do original (existindo ou não)."""
+    fmt = fmt or THUMBNAIL_FORMAT
+    ext = "webp" if fmt == "WEBP" else "jpg"
+    return THUMBNAIL_DIR / f"{digest}_{THUMBNAIL_SIZES[size]}.{ext}"
+
+def make_thumbnail(image_bytes, size='medium', fmt=None, digest=None):
+    """
+    Gera (ou reaproveita) a miniatura dos bytes de uma imagem e retorna o caminho do arquivo.
+    `digest` é o SHA-256 dos bytes, quando já conhecido (ex.: imagens do armazenamento).
+    """
+    from PIL import Image, ImageOps
+    
+    fmt = fmt or THUMBNAIL_FORMAT
+    side = THUMBNAIL_SIZES[size]
+    digest = digest or hashlib.sha256(image_bytes).hexdigest()
+    path = thumbnail_path(digest, size, fmt)
+    if path.exists():
+        return str(path)
     
-    # Try Blob
-    if product_row['image']:
-        return product_row['image']
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((side, side))
+        if fmt == "JPEG" and img.mode != "RGB":
+            # JPEG não tem transparência: aplica fundo branco
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            rgba = img.convert("RGBA")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            img = background
         
-    return None
+        THUMBNAIL_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        img.save(tmp_path, format=fmt, quality=THUMBNAIL_QUALITY)
+        os.replace(tmp_path, path)
+    return str(path)
+
+def get_product_thumbnail(product_row, size='medium'):
+    """
+    Versão reduzida de get_product_image_source para as grades de produtos.
+    Em caso de erro na conversão, devolve a imagem original.
+    """
+    source = get_product_image_source(product_row)
+    if source is None:
+        return None
+    
+    try:
+        if isinstance(source, str):
+            stat = os.stat(source)
+            key = (source, stat.st_mtime_ns, stat.st_size, size)
+            thumb = _thumbnail_memo.get(key)
+            if thumb and os.path.exists(thumb):
+                return thumb
+            with open(source, "rb") as f:
+                thumb = make_thumbnail(f.read(), size)
+            _thumbnail_memo[key] = thumb
+            return thumb
+        return make_thumbnail(source, size)
+    except Exception as e:
+        print(f"Erro ao gerar miniatura: {e}")
+        return source
+
+# Fotos de perfil
+# Reduzidas no upload; a barra lateral mostra a foto com width=150, então
+# AVATAR_SIZE cobre telas de alta densidade sem guardar a foto original.
+AVATAR_SIZE = 300
+AVATAR_MAX_BYTES = 96 * 1024  # acima disso a foto é de antes da redução e é refeita
+
+def make_avatar(image_bytes):
+    """Reduz uma foto de perfil para no máximo AVATAR_SIZE px de lado e retorna os bytes."""
+    from PIL import Image, ImageOps
+    
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((AVATAR_SIZE, AVATAR_SIZE))
+        if THUMBNAIL_FORMAT == "JPEG" and img.mode != "RGB":
+            img = img.convert("RGB")
+        buffer = io.BytesIO()
+        img.save(buffer, format=THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+    return buffer.getvalue()
+
+def save_user_avatar(user_id, image_bytes):
+    """Reduz e grava a foto de perfil; retorna True se o usuário foi atualizado."""
+    return db.update_user_image(user_id, make_avatar(image_bytes))
+
+def get_user_avatar(user_id):
+    """
+    Foto de perfil para a barra lateral (bytes ou None).
+    Fotos gravadas antes da redução no upload são reduzidas na primeira leitura.
+    """
+    avatar = db.get_user_avatar(user_id)
+    if avatar and len(avatar) > AVATAR_MAX_BYTES:
+        try:
+            if save_user_avatar(user_id, avatar):
+                avatar = db.get_user_avatar(user_id)
+        except Exception as e:
+            print(f"Erro ao reduzir foto de perfil: {e}")
+    return avatar
 
 def ensure_directories():
     """Garante que diretórios essenciais existam"""
     try:
-        Path("assets").mkdir(parents=True, exist_ok=True)
+        ASSETS_DIR.mkdir(parents=True, exist_ok=True)
+        THUMBNAIL_DIR.mkdir(parents=True, exist_ok=True)
     except Exception as e:
         print(f"Erro ao criar diretórios: {e}")
 
@@ -279,45 +415,5 @@ def apply_custom_css():
         </style>
     """, unsafe_allow_html=True)
 
-from fpdf import FPDF
-import pandas as pd
-import io
-
-def generate_pdf(products_df):
-    pdf = FPDF()
-    pdf.add_page()
-    # Usar fonte padrão que suporta caracteres básicos, mas para caracteres especiais complexos
-    # FPDF padrão tem limitações. Vamos tentar limpar o texto ou usar codificação 'latin-1' compatível
-    pdf.set_font("Arial", size=12)
-    
-    pdf.cell(200, 10, txt="Relatório de Produtos", ln=1, align='C')
-    pdf.ln(10)
-    
-    for index, row in products_df.iterrows():
-        # Função auxiliar para limpar/substituir caracteres problemáticos
-        def clean_text(text):
-            try:
-                # Tenta codificar e decodificar para garantir compatibilidade com latin-1
-                return str(text).encode('latin-1', 'replace').decode('latin-1')
-            except Exception:
-                return "?"
-
-        # Truncate text to avoid overflow if necessary, or just simple list
-        try:
-            text = f"ID: {row['id']} | Nome: {clean_text(str(row['name'])[:30])} | Marca: {clean_text(str(row['brand'])[:15])}"
-            text2 = f"   Qtd: {row['quantity']} | Preço: R$ {row['price']} | Val: {row['expiration_date']}"
-            pdf.cell(0, 8, txt=text, ln=1)
-            pdf.cell(0, 8, txt=text2, ln=1)
-            pdf.ln(2)
-        except Exception as e:
-            print(f"Erro ao gerar linha PDF: {e}")
-            pdf.cell(0, 8, txt="Erro ao processar linha", ln=1)
-        
-    try:
-        output = pdf.output(dest='S')
-        return output.encode('latin-1', 'replace') if isinstance(output, str) else bytes(output)
-    except Exception as e:
-        return b""
-
 def convert_df_to_csv(df):
     return df.to_csv(index=False).encode('utf-8')
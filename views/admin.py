@@ -1,123 +1,179 @@
 import streamlit as st
 import pandas as pd
+import os
 import database as db
 import utils
+import exports
 import views.components as components
 import datetime
+import perf
 
-def show_admin_view(user):
-    st.title(f"Painel Administrativo - Bem-vindo, {user[4]}")
+def render_dashboard_metrics():
+    """Métricas, gráfico e últimas vendas do dashboard. Retorna o total de produtos."""
+    st.header("Visão Geral")
+    summary = db.get_dashboard_summary()
+    total_products = db.count_products()
     
-    tab1, tab2, tab3 = st.tabs(["Dashboard", "Gerenciar Produtos", "Gerenciar Usuários"])
+    col1, col2, col3 = st.columns(3)
     
-    with tab1:
-        # Aniversariantes do Dia
-        birthday_clients = db.get_birthday_clients()
-        if not birthday_clients.empty:
+    total_stock = summary['total_stock']
+    total_sold = summary['total_sold']
+    total_revenue = summary['total_revenue']
+    
+    col1.metric("Produtos em Estoque", int(total_stock))
+    col2.metric("Produtos Vendidos", int(total_sold))
+    col3.metric("Receita Total", f"R$ {total_revenue:.2f}")
+
+    # Nova linha de métricas
+    st.subheader("Valores Totais")
+    col4, col5 = st.columns(2)
+    
+    # Valor total em estoque (preço * quantidade para cada produto)
+    total_stock_value = summary['stock_value']
+    
+    col4.metric("Valor Total em Estoque", f"R$ {total_stock_value:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+    
+    # Valor total vendido formatado com destaque
+    formatted_revenue = f"R$ {total_revenue:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    col5.metric("Valor Total Vendido (Receita)", formatted_revenue)
+    
+    st.markdown(f"""
+    <div style="background-color: #d4edda; padding: 10px; border-radius: 5px; color: #155724; font-weight: bold; margin-top: 10px; border: 1px solid #c3e6cb;">
+        💰 VALOR TOTAL DOS PRODUTOS VENDIDOS: {formatted_revenue}
+    </div>
+    """, unsafe_allow_html=True)
+
+    st.subheader("Estoque vs Vendas")
+    if total_products > 0 or summary['sale_count'] > 0:
+        chart_data = pd.DataFrame({
+            'Categoria': ['Estoque', 'Vendidos'],
+            'Quantidade': [total_stock, total_sold]
+        })
+        st.bar_chart(chart_data, x='Categoria', y='Quantidade', color="#800020")
+        
+    st.subheader("Últimas Vendas")
+    if summary['sale_count'] > 0:
+        st.dataframe(db.get_recent_sales(10))
+    else:
+        st.info("Nenhuma venda registrada.")
+    
+    return total_products
+
+def render_sales_export():
+    """Exportação do histórico de vendas (CSV/Parquet) com filtros de período e produto."""
+    with st.expander("Exportar vendas"):
+        # Produtos escolhidos pela busca do PDV (nome ou código), sem carregar o catálogo
+        chosen = st.session_state.setdefault('sales_export_products', {})
+        search = st.text_input("Filtrar por produto (nome ou código)", key="sales_export_search")
+        if search:
+            matches = db.search_pos_products(search, in_stock_only=False)
+            if matches.empty:
+                st.caption("Nenhum produto encontrado.")
+            else:
+                options = {int(row.id): f"{row.id} - {row.name}" for row in matches.itertuples(index=False)}
+                col_pick, col_add = st.columns([3, 1])
+                picked = col_pick.selectbox("Produto", list(options), format_func=options.get, key="sales_export_pick")
+                if col_add.button("Adicionar", key="sales_export_add"):
+                    chosen[picked] = options[picked]
+        if chosen:
+            st.caption("Produtos: " + "; ".join(chosen.values()))
+            st.button("Limpar produtos", key="sales_export_clear", on_click=chosen.clear)
+
+        with st.form("sales_export_form"):
             today = datetime.date.today()
-            birthdays_today = []
-            
-            for index, row in birthday_clients.iterrows():
+            col1, col2 = st.columns(2)
+            start = col1.date_input("De", value=today - datetime.timedelta(days=30), format="DD/MM/YYYY")
+            end = col2.date_input("Até", value=today, format="DD/MM/YYYY")
+            formats = [fmt for fmt in exports.SALES_FORMATS if fmt != 'parquet' or exports.parquet_available()]
+            fmt = st.radio("Formato", formats, format_func=lambda f: exports.SALES_FORMATS[f]['label'], horizontal=True)
+            submitted = st.form_submit_button("Gerar exportação")
+
+        if submitted:
+            if start > end:
+                st.error("A data inicial é posterior à final.")
+            else:
+                bar = st.progress(0.0, text="Exportando vendas...")
                 try:
-                    bdate_str = str(row['birth_date'])
-                    # Assume formato YYYY-MM-DD
-                    bdate = datetime.datetime.strptime(bdate_str, "%Y-%m-%d").date()
-                    if bdate.month == today.month and bdate.day == today.day:
-                        birthdays_today.append(row)
-                except:
-                    pass
+                    path, rows = exports.build_sales_export(
+                        fmt, start, end, list(chosen),
+                        progress=lambda f: bar.progress(f, text=f"Exportando vendas... {f:.0%}"))
+                    st.session_state['sales_export'] = {'path': str(path), 'fmt': fmt, 'rows': rows,
+                                                        'file_name': f"vendas_{start:%Y%m%d}_{end:%Y%m%d}.{fmt}"}
+                except Exception as e:
+                    print(f"Erro ao exportar vendas: {e}")
+                    st.error(f"Erro ao exportar vendas: {e}")
+                bar.empty()
+
+        export = st.session_state.get('sales_export')
+        if export and os.path.exists(export['path']):
+            # O arquivo só é lido quando o botão é clicado
+            st.download_button(f"Baixar {exports.SALES_FORMATS[export['fmt']]['label']} ({export['rows']} vendas)",
+                               data=lambda: exports.read_export(export), file_name=export['file_name'],
+                               mime=exports.SALES_FORMATS[export['fmt']]['mime'], key="sales_export_dl")
+
+@st.fragment
+def render_dashboard_card(row, metrics_area):
+    # Fragmento: a venda rápida reexecuta só este card e as métricas
+    result = st.session_state.pop(f"dash_result_{row['id']}", None)
+    if result:
+        success, msg = result
+        st.toast(msg, icon="✅" if success else "❌")
+        if success:
+            with metrics_area.container():
+                render_dashboard_metrics()
+    row = components.refresh_product_row(row)
+    if row is None:
+        st.caption("Produto removido.")
+        return
+    
+    with st.container(border=True):
+        # Image
+        img_src = utils.get_product_thumbnail(row)
+        if img_src:
+            st.image(img_src, use_container_width=True)
+        else:
+            st.markdown("*Sem Imagem*")
             
-            if birthdays_today:
-                st.warning(f"🎉 Existem {len(birthdays_today)} aniversariante(s) hoje! Lembre-se de parabenizá-los.")
-                for b_client in birthdays_today:
-                    st.markdown(f"🎂 **{b_client['name']}** - Tel: {b_client['phone'] or 'N/A'} - Email: {b_client['email'] or 'N/A'}")
-                st.divider()
-
-        st.header("Visão Geral")
-        products = db.get_products()
-        sales = db.get_sales_report()
-        
-        col1, col2, col3 = st.columns(3)
-        
-        total_stock = products['quantity'].sum() if not products.empty else 0
-        total_sold = sales['quantity'].sum() if not sales.empty else 0
-        total_revenue = sales['total_value'].sum() if not sales.empty else 0.0
+        st.markdown(f"**{row['name']}**")
+        st.caption(f"Estoque: {row['quantity']}")
+        st.markdown(f"**R$ {row['price']:.2f}**")
+        st.caption(f"Val: {row['expiration_date']}")
         
-        col1.metric("Produtos em Estoque", int(total_stock))
-        col2.metric("Produtos Vendidos", int(total_sold))
-        col3.metric("Receita Total", f"R$ {total_revenue:.2f}")
+        # Quick Sale Action
+        if row['quantity'] > 0:
+            with st.expander("Vender"):
+                qty_key = f"dash_sell_{row['id']}"
+                components.clamp_sale_qty(qty_key, row['quantity'])
+                st.number_input("Qtd", 1, int(row['quantity']), key=qty_key)
+                st.button("OK", key=f"dash_btn_{row['id']}", on_click=components.sell_from_card,
+                          args=(int(row['id']), qty_key, f"dash_result_{row['id']}"))
 
-        # Nova linha de métricas
-        st.subheader("Valores Totais")
-        col4, col5 = st.columns(2)
-        
-        # Valor total em estoque (preço * quantidade para cada produto)
-        total_stock_value = (products['price'] * products['quantity']).sum() if not products.empty else 0.0
-        
-        col4.metric("Valor Total em Estoque", f"R$ {total_stock_value:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-        
-        # Valor total vendido formatado com destaque
-        formatted_revenue = f"R$ {total_revenue:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        col5.metric("Valor Total Vendido (Receita)", formatted_revenue)
-        
-        st.markdown(f"""
-        <div style="background-color: #d4edda; padding: 10px; border-radius: 5px; color: #155724; font-weight: bold; margin-top: 10px; border: 1px solid #c3e6cb;">
-            💰 VALOR TOTAL DOS PRODUTOS VENDIDOS: {formatted_revenue}
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.subheader("Estoque vs Vendas")
-        if not products.empty or not sales.empty:
-            chart_data = pd.DataFrame({
-                'Categoria': ['Estoque', 'Vendidos'],
-                'Quantidade': [total_stock, total_sold]
-            })
-            st.bar_chart(chart_data, x='Categoria', y='Quantidade', color="#800020")
-            
-        st.subheader("Últimas Vendas")
-        if not sales.empty:
-            st.dataframe(sales.sort_values(by='sale_date', ascending=False).head(10))
-        else:
-            st.info("Nenhuma venda registrada.")
+@perf.timed(kind='view')
+def show_admin_view(user):
+    st.title(f"Painel Administrativo - Bem-vindo, {user.name}")
+    
+    tab1, tab2, tab3, tab4 = st.tabs(["Dashboard", "Gerenciar Produtos", "Gerenciar Usuários", "Desempenho"])
+    
+    with tab1:
+        # Aniversariantes do Dia (e dos próximos dias)
+        with perf.section("admin: aniversariantes"):
+            render_birthdays()
+
+        # Métricas num placeholder: uma venda num card redesenha só esta área
+        metrics_area = st.empty()
+        with perf.section("admin: métricas"), metrics_area.container():
+            total_products = render_dashboard_metrics()
+
+        with perf.section("admin: exportar vendas"):
+            render_sales_export()
 
         st.divider()
         st.subheader("Visualização Rápida de Produtos (Dashboard)")
         
         # Dashboard Product Grid (Simplified view, maybe allow sale)
-        if not products.empty:
-            cols_per_row = 4
-            rows = len(products)
-            
-            for i in range(0, rows, cols_per_row):
-                cols = st.columns(cols_per_row)
-                for j in range(cols_per_row):
-                    if i + j < rows:
-                        row = products.iloc[i + j]
-                        with cols[j]:
-                            with st.container(border=True):
-                                # Image
-                                img_src = utils.get_product_image_source(row)
-                                if img_src:
-                                    st.image(img_src, use_container_width=True)
-                                else:
-                                    st.markdown("*Sem Imagem*")
-                                    
-                                st.markdown(f"**{row['name']}**")
-                                st.caption(f"Estoque: {row['quantity']}")
-                                st.markdown(f"**R$ {row['price']:.2f}**")
-                                st.caption(f"Val: {row['expiration_date']}")
-                                
-                                # Quick Sale Action
-                                if row['quantity'] > 0:
-                                    with st.expander("Vender"):
-                                        q_sell = st.number_input("Qtd", 1, int(row['quantity']), key=f"dash_sell_{row['id']}")
-                                        if st.button("OK", key=f"dash_btn_{row['id']}"):
-                                            success, msg = db.register_sale(int(row['id']), q_sell, user[0])
-                                            if success:
-                                                st.toast(msg, icon="✅")
-                                                st.rerun()
-                                            else:
-                                                st.toast(msg, icon="❌")
+        if total_products > 0:
+            with perf.section("admin: grade de produtos"):
+                render_dashboard_grid(total_products, metrics_area)
         else:
             st.info("Nenhum produto cadastrado.")
 
@@ -125,40 +181,109 @@ def show_admin_view(user):
         components.render_product_management()
 
     with tab3:
-        st.header("Gerenciar Usuários")
-        with st.form("add_user"):
-            new_user = st.text_input("Username")
-            new_pass = st.text_input("Senha", type="password")
-            new_role = st.selectbox("Função", ["admin", "funcionario", "cliente"])
-            new_name = st.text_input("Nome Completo")
-            
-            st.markdown("---")
-            st.caption("Informações Adicionais (Para Clientes)")
-            col_u1, col_u2 = st.columns(2)
-            with col_u1:
-                new_birth_date = st.date_input("Data de Nascimento", value=None, min_value=datetime.date(1920, 1, 1), format="DD/MM/YYYY")
-                new_email = st.text_input("Email")
-            with col_u2:
-                new_phone = st.text_input("Telefone")
-                new_cpf = st.text_input("CPF")
-            
-            if st.form_submit_button("Criar Usuário"):
-                if new_user and new_pass:
-                    # Converter data para string
-                    bdate_val = str(new_birth_date) if new_birth_date else None
-                    
-                    if db.create_user(new_user, new_pass, new_role, new_name, bdate_val, new_email, new_phone, new_cpf):
-                        st.success("Usuário criado!")
-                        st.rerun()
-                    else:
-                        st.error("Erro ao criar (usuário já existe?)")
+        with perf.section("admin: usuários"):
+            render_user_management()
+
+    with tab4:
+        render_performance_panel()
+
+def render_birthdays():
+    birthday_clients = db.get_birthday_clients(days=7)
+    if not birthday_clients.empty:
+        birthdays_today = birthday_clients[birthday_clients['days_until'] == 0]
+        upcoming = birthday_clients[birthday_clients['days_until'] > 0]
+        
+        if not birthdays_today.empty:
+            st.warning(f"🎉 Existem {len(birthdays_today)} aniversariante(s) hoje! Lembre-se de parabenizá-los.")
+            for _, b_client in birthdays_today.iterrows():
+                st.markdown(f"🎂 **{b_client['name']}** - Tel: {b_client['phone'] or 'N/A'} - Email: {b_client['email'] or 'N/A'}")
+        
+        if not upcoming.empty:
+            with st.expander(f"Próximos aniversariantes (7 dias): {len(upcoming)}"):
+                for _, b_client in upcoming.iterrows():
+                    st.markdown(f"📅 **{b_client['name']}** - em {b_client['days_until']} dia(s) - Tel: {b_client['phone'] or 'N/A'}")
+        st.divider()
+
+def render_dashboard_grid(total_products, metrics_area):
+    page, page_size = components.render_pagination("dash_grid", total_products)
+    page_df = db.get_products_page(page, page_size)
+    
+    cols_per_row = 4
+    rows = len(page_df)
+    
+    for i in range(0, rows, cols_per_row):
+        cols = st.columns(cols_per_row)
+        for j in range(cols_per_row):
+            if i + j < rows:
+                row = page_df.iloc[i + j]
+                with cols[j]:
+                    render_dashboard_card(row, metrics_area)
+
+def render_user_management():
+    st.header("Gerenciar Usuários")
+    with st.form("add_user"):
+        new_user = st.text_input("Username")
+        new_pass = st.text_input("Senha", type="password")
+        new_role = st.selectbox("Função", ["admin", "funcionario", "cliente"])
+        new_name = st.text_input("Nome Completo")
+
+        st.markdown("---")
+        st.caption("Informações Adicionais (Para Clientes)")
+        col_u1, col_u2 = st.columns(2)
+        with col_u1:
+            new_birth_date = st.date_input("Data de Nascimento", value=None, min_value=datetime.date(1920, 1, 1), format="DD/MM/YYYY")
+            new_email = st.text_input("Email")
+        with col_u2:
+            new_phone = st.text_input("Telefone")
+            new_cpf = st.text_input("CPF")
+
+        if st.form_submit_button("Criar Usuário"):
+            if new_user and new_pass:
+                # Converter data para string
+                bdate_val = str(new_birth_date) if new_birth_date else None
+
+                if db.create_user(new_user, new_pass, new_role, new_name, bdate_val, new_email, new_phone, new_cpf):
+                    st.success("Usuário criado!")
+                    st.rerun()
                 else:
-                    st.error("Preencha todos os campos obrigatórios")
-                    
-        st.subheader("Usuários Existentes")
-        conn = db.get_connection()
-        # Update query to show new fields if needed, but dataframe might get too wide. 
-        # Keeping it simple or maybe showing email/phone.
-        users_df = pd.read_sql("SELECT id, username, role, name, email, phone FROM users", conn)
-        conn.close()
-        st.dataframe(users_df)
+                    st.error("Erro ao criar (usuário já existe?)")
+            else:
+                st.error("Preencha todos os campos obrigatórios")
+
+    st.subheader("Usuários Existentes")
+    users_df = db.get_users()
+    st.dataframe(users_df)
+
+def render_performance_panel():
+    st.header("Desempenho")
+    if not perf.PERF_ENABLED:
+        st.info("Instrumentação desativada (PERF_ENABLED=0).")
+        return
+    
+    events = perf.get_events()
+    st.caption(f"Últimos {len(events)} eventos deste processo (buffer de {perf.PERF_BUFFER_SIZE}); "
+               f"chamadas acima de {perf.SLOW_QUERY_MS:.0f} ms guardam o SQL executado.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Exportar eventos (JSON lines)", data=perf.export_jsonl(),
+                           file_name="desempenho.jsonl", mime="application/x-ndjson")
+    with col2:
+        if st.button("Limpar buffer"):
+            perf.clear()
+            st.rerun()
+    
+    summary = perf.summary()
+    if summary.empty:
+        st.info("Nenhuma medição ainda.")
+        return
+    
+    st.subheader("Por operação")
+    kinds = st.multiselect("Tipo", sorted(summary['kind'].unique()), default=sorted(summary['kind'].unique()))
+    st.dataframe(summary[summary['kind'].isin(kinds)], use_container_width=True, hide_index=True)
+    
+    slow = perf.slow_events()
+    st.subheader(f"Chamadas lentas ({len(slow)})")
+    for event in reversed(slow[-20:]):
+        with st.expander(f"{event['name']} - {event['sql_ms']:.0f} ms de SQL ({event['ms']:.0f} ms no total)"):
+            st.code(";\n\n".join(event['sql']), language="sql")
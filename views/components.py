@@ -3,320 +3,377 @@ import pandas as pd
 import database as db
 import utils
 import datetime
+import perf
+import exports
 
-def render_product_management():
-    st.header("Gerenciamento de Produtos")
+def refresh_product_row(row):
+    """Relê os dados de um card pelo id (consulta pela chave primária); None se o produto não existe mais."""
+    prod = db.get_product_by_id(int(row['id']))
+    if prod is None:
+        return None
+    fresh = row.copy()
+    for col, value in zip(db.PRODUCT_COLUMNS, prod):
+        fresh[col] = value
+    return fresh
+
+def sell_from_card(product_id, qty_key, result_key):
+    # Callback dos botões de venda dos cards: roda antes do rerun do fragmento,
+    # que então já desenha o card com o estoque atualizado
+    user = st.session_state.get('user')
+    user_id = user.id if user else None
+    st.session_state[result_key] = db.register_sale(product_id, int(st.session_state[qty_key]), user_id)
+
+def clamp_sale_qty(qty_key, stock):
+    # Após uma venda o estoque pode ficar abaixo da quantidade escolhida antes
+    if st.session_state.get(qty_key, 1) > stock:
+        st.session_state[qty_key] = max(int(stock), 1)
+
+PAGE_SIZES = [12, 24, 48, 96]
+
+def render_pagination(key, total, default_page_size=24):
+    """
+    Controles de paginação das grades de produtos.
+    Retorna (página, itens por página); a página começa em 1.
+    """
+    page_key = f"{key}_page"
+    col_size, col_page, col_info = st.columns([1, 1, 2])
+    page_size = col_size.selectbox("Itens por página", PAGE_SIZES,
+                                   index=PAGE_SIZES.index(default_page_size), key=f"{key}_page_size")
+    pages = max((total + page_size - 1) // page_size, 1)
     
-    # Add Product Form
-    with st.expander("Adicionar Novo Produto"):
-        with st.form("add_product_form_comp"):
-            name = st.text_input("Nome do Produto")
-            col_a, col_b = st.columns(2)
-            brand = col_a.selectbox("Marca", utils.MARCAS)
-            style = col_b.selectbox("Estilo", utils.ESTILOS)
-            type_ = st.selectbox("Tipo", utils.TIPOS)
+    # Filtro ou tamanho de página mudou: mantém a página dentro do intervalo
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    page = col_page.number_input(f"Página (de {pages})", min_value=1, max_value=pages, step=1, key=page_key)
+    
+    first = (page - 1) * page_size + 1 if total else 0
+    last = min(page * page_size, total)
+    col_info.caption(f"Mostrando {first}–{last} de {total} produtos")
+    return int(page), page_size
+
+@st.dialog("Detalhes do Produto", width="large")
+def show_product_detail(product_row):
+    # Única tela que envia a imagem original; as grades usam miniaturas
+    img_src = utils.get_product_image_source(product_row)
+    if img_src:
+        st.image(img_src, use_container_width=True)
+    else:
+        st.markdown("*Sem Imagem*")
+    st.subheader(product_row['name'])
+    st.caption(f"{product_row['brand']} | {product_row['style']} | {product_row['type']}")
+    st.markdown(f"**Preço:** R$ {product_row['price']:.2f}")
+    st.markdown(f"**Validade:** {product_row['expiration_date']}")
+    st.markdown(f"**Estoque:** {product_row['quantity']}")
+    if isinstance(product_row.get('sku'), str):
+        st.markdown(f"**Código:** {product_row['sku']}")
+
+@st.fragment
+def render_product_card(row):
+    # Fragmento: vender reexecuta só este card, não a página inteira.
+    # Os argumentos são os da última execução completa, por isso o card relê o produto.
+    result = st.session_state.pop(f"sell_result_{row['id']}", None)
+    if result:
+        success, msg = result
+        st.toast(msg, icon="✅" if success else "❌")
+    row = refresh_product_row(row)
+    if row is None:
+        st.caption("Produto removido.")
+        return
+    
+    with st.container(border=True):
+        # Image
+        img_src = utils.get_product_thumbnail(row)
+        if img_src:
+            st.image(img_src, use_container_width=True)
+        else:
+            st.markdown("*Sem Imagem*")
+            
+        st.markdown(f"**{row['name']}**")
+        st.caption(f"{row['brand']} | {row['style']}")
+        st.markdown(f"**Preço:** R$ {row['price']:.2f}")
+        st.markdown(f"**Validade:** {row['expiration_date']}")
+        st.markdown(f"**Estoque:** {row['quantity']}")
+        if st.button("Ver detalhes", key=f"btn_detail_{row['id']}"):
+            show_product_detail(row)
+        
+        # Actions Expander
+        with st.expander("Gerenciar"):
+            # Sale
+            st.markdown("##### Vender")
+            if row['quantity'] > 0:
+                qty_key = f"sell_qty_{row['id']}"
+                clamp_sale_qty(qty_key, row['quantity'])
+                st.number_input("Qtd", min_value=1, max_value=int(row['quantity']), key=qty_key)
+                st.button("Vender", key=f"btn_sell_{row['id']}", on_click=sell_from_card,
+                          args=(int(row['id']), qty_key, f"sell_result_{row['id']}"))
+            else:
+                st.warning("Esgotado")
             
-            col_c, col_d, col_e = st.columns(3)
-            price = col_c.number_input("Preço (R$)", min_value=0.01, format="%.2f")
-            quantity = col_d.number_input("Quantidade", min_value=1, step=1)
-            exp_date = col_e.date_input("Data de Vencimento")
+            st.divider()
             
-            image = st.file_uploader("Imagem do Produto", type=['png', 'jpg', 'jpeg'])
+            # O formulário de edição fica fora do card: abrir exige rerun da página
+            if st.button("Editar / Excluir", key=f"btn_edit_{row['id']}"):
+                st.session_state['edit_prod_id'] = int(row['id'])
+                st.rerun()
+
+def close_edit_form():
+    st.session_state.pop('edit_prod_id', None)
+
+@st.fragment
+def render_edit_form():
+    # Fragmento: interações no formulário e "Cancelar" não reexecutam a página;
+    # salvar/excluir recarregam a página para a grade refletir a mudança
+    if 'edit_prod_id' not in st.session_state:
+        return
+    prod_id = st.session_state['edit_prod_id']
+    action_prod = db.get_product_by_id(prod_id)
+    if action_prod:
+        with st.form(f"edit_prod_form_{prod_id}"):
+            st.subheader(f"Editando: {action_prod[1]}")
+            e_name = st.text_input("Nome", value=action_prod[1])
             
-            submitted = st.form_submit_button("Cadastrar Produto")
-            if submitted:
-                # Validação de Erros
-                errors = []
-                
-                if not name or not name.strip():
-                    errors.append("O nome do produto é obrigatório.")
-                
-                if price <= 0:
-                    errors.append("O preço deve ser maior que zero.")
-                    
-                if quantity < 0:
-                    errors.append("A quantidade não pode ser negativa.")
-                
-                # Processamento da Imagem
-                img_bytes = None
-                if image:
+            try: b_idx = utils.MARCAS.index(action_prod[2])
+            except: b_idx = 0
+            e_brand = st.selectbox("Marca", utils.MARCAS, index=b_idx)
+            
+            try: s_idx = utils.ESTILOS.index(action_prod[3])
+            except: s_idx = 0
+            e_style = st.selectbox("Estilo", utils.ESTILOS, index=s_idx)
+            
+            try: t_idx = utils.TIPOS.index(action_prod[4])
+            except: t_idx = 0
+            e_type = st.selectbox("Tipo", utils.TIPOS, index=t_idx)
+            e_sku = st.text_input("Código (SKU / código de barras)", value=action_prod[8] or "")
+            
+            try: e_price_val = float(action_prod[5])
+            except: e_price_val = 0.0
+            e_price = st.number_input("Preço", value=e_price_val, min_value=0.01)
+            
+            try: e_qty_val = int(action_prod[6])
+            except: e_qty_val = 0
+            e_qty = st.number_input("Qtd", value=e_qty_val, min_value=0, step=1)
+            
+            # Datas são gravadas normalizadas (AAAA-MM-DD)
+            default_date = datetime.date.today()
+            if action_prod[7]:
+                try:
+                    default_date = datetime.date.fromisoformat(db.normalize_date(action_prod[7]))
+                except ValueError:
+                    pass
+            e_exp_date = st.date_input("Vencimento", value=default_date)
+            
+            e_image = st.file_uploader("Nova Imagem", type=['png', 'jpg', 'jpeg'])
+            
+            col_save, col_del, col_close = st.columns(3)
+            
+            with col_save:
+                if st.form_submit_button("Salvar"):
                     try:
-                        # Limite de tamanho (ex: 10MB)
-                        if image.size > 10 * 1024 * 1024:
-                            errors.append("A imagem é muito grande (máximo 10MB).")
-                        else:
-                            img_bytes = image.read()
+                        # Sem nova imagem, a atual é mantida (update_product ignora None)
+                        img_bytes = None
+                        if e_image:
+                            img_bytes = e_image.read()
+                        
+                        db.update_product(prod_id, e_name, e_brand, e_style, e_type, e_price, e_qty, str(e_exp_date), img_bytes, sku=e_sku)
+                        st.success("Produto atualizado!")
+                        if 'edit_prod_id' in st.session_state: del st.session_state['edit_prod_id']
+                        st.rerun()
                     except Exception as e:
-                        errors.append(f"Erro ao processar a imagem: {e}")
-                
-                if errors:
-                    for err in errors:
-                        st.error(f"❌ {err}")
-                else:
+                        st.error(f"Erro ao atualizar: {e}")
+            
+            with col_del:
+                if st.form_submit_button("EXCLUIR", type="primary"):
                     try:
-                        db.add_product(name.strip(), brand, style, type_, price, quantity, str(exp_date), img_bytes)
-                        st.success("✅ Produto cadastrado com sucesso!")
+                        db.delete_product(prod_id)
+                        st.success("Produto excluído.")
+                        if 'edit_prod_id' in st.session_state: del st.session_state['edit_prod_id']
                         st.rerun()
                     except Exception as e:
-                        st.error(f"❌ Erro ao salvar no banco de dados: {e}")
+                        st.error(f"Erro ao excluir: {e}")
+                    
+            with col_close:
+                # Callback: o estado é limpo antes do rerun do fragmento, que então não desenha nada
+                st.form_submit_button("Cancelar", on_click=close_edit_form)
+    else:
+         # Produto não existe mais
+         if 'edit_prod_id' in st.session_state: del st.session_state['edit_prod_id']
 
-    # Import/Export Section
-    with st.expander("Importar / Exportar Dados"):
-        col_ie1, col_ie2 = st.columns(2)
-        products_df_ex = db.get_products()
-        
-        with col_ie1:
-            st.write("### Exportar")
-            if not products_df_ex.empty:
-                pdf_bytes = utils.generate_pdf(products_df_ex)
-                st.download_button("Baixar PDF", data=pdf_bytes, file_name="produtos.pdf", mime="application/pdf", key="pdf_dl")
-                
-                csv_data = utils.convert_df_to_csv(products_df_ex.drop(columns=['image']).rename(columns={
-                    'name': 'nome', 'brand': 'marca', 'style': 'estilo', 
-                    'type': 'tipo', 'price': 'preco', 'quantity': 'quantidade', 
-                    'expiration_date': 'data_validade'
-                }))
-                st.download_button("Exportar CSV", data=csv_data, file_name="produtos.csv", mime="text/csv", key="csv_dl")
-            else:
-                st.info("Sem dados para exportar.")
+def render_export_panel():
+    # Enquanto houver exportação em andamento o painel se atualiza sozinho a cada segundo
+    running = exports.any_running()
+    st.fragment(_export_panel_body, run_every=1.0 if running else None)(running)
 
-        with col_ie2:
-            st.write("### Importar")
-            uploaded_csv = st.file_uploader("Arquivo CSV", type=['csv'], key="csv_up")
-            if uploaded_csv:
-                if st.button("Processar Importação", key="btn_import"):
-                    try:
-                        # Tenta detectar o separador automaticamente
-                        imported_df = pd.read_csv(uploaded_csv, sep=None, engine='python')
+def _export_panel_body(polling):
+    if exports.any_running() != polling:
+        # Começou ou terminou uma exportação: reexecuta a página para ligar/desligar a atualização
+        st.rerun()
+    
+    for kind, info in exports.EXPORT_KINDS.items():
+        job = exports.get_export(kind)
+        if job and job['status'] == 'running':
+            st.progress(job['progress'], text=f"Gerando {info['label']}... {job['progress']:.0%}")
+        elif job and job['status'] == 'done':
+            # Callable: o arquivo só é lido quando alguém clica em baixar
+            st.download_button(f"Baixar {info['label']}", data=lambda job=job: exports.read_export(job), file_name=info['file_name'],
+                               mime=info['mime'], key=f"{kind}_dl")
+            st.caption(f"Gerado em {job['seconds']} s; reaproveitado enquanto o catálogo não mudar.")
+        else:
+            if job and job['status'] == 'error':
+                st.error(f"Erro ao gerar {info['label']}: {job['error']}")
+            st.button(f"Gerar {info['label']}", key=f"{kind}_gen", on_click=exports.request_export, args=(kind,))
+
+@perf.timed(kind='view')
+def render_product_management():
+    st.header("Gerenciamento de Produtos")
+    
+    # Add Product Form
+    with perf.section("produtos: cadastro"):
+        with st.expander("Adicionar Novo Produto"):
+            with st.form("add_product_form_comp"):
+                name = st.text_input("Nome do Produto")
+                col_a, col_b = st.columns(2)
+                brand = col_a.selectbox("Marca", utils.MARCAS)
+                style = col_b.selectbox("Estilo", utils.ESTILOS)
+                type_ = st.selectbox("Tipo", utils.TIPOS)
+                sku = st.text_input("Código (SKU / código de barras)", help="Opcional. Deve ser único.")
+                
+                col_c, col_d, col_e = st.columns(3)
+                price = col_c.number_input("Preço (R$)", min_value=0.01, format="%.2f")
+                quantity = col_d.number_input("Quantidade", min_value=1, step=1)
+                exp_date = col_e.date_input("Data de Vencimento")
+                
+                image = st.file_uploader("Imagem do Produto", type=['png', 'jpg', 'jpeg'])
+                
+                submitted = st.form_submit_button("Cadastrar Produto")
+                if submitted:
+                    # Validação de Erros
+                    errors = []
+                    
+                    if not name or not name.strip():
+                        errors.append("O nome do produto é obrigatório.")
+                    
+                    if price <= 0:
+                        errors.append("O preço deve ser maior que zero.")
                         
-                        # Validar se as colunas mínimas existem
-                        # Colunas esperadas: nome, marca, estilo, tipo, preco, quantidade, data_validade
-                        # Vamos ser flexíveis, mas 'nome' é essencial
-                        if 'nome' not in imported_df.columns:
-                            st.error("❌ O arquivo CSV deve conter pelo menos a coluna 'nome'.")
-                        else:
-                            success_count = 0
-                            fail_count = 0
-                            error_log = []
+                    if quantity < 0:
+                        errors.append("A quantidade não pode ser negativa.")
+                    
+                    # Processamento da Imagem
+                    img_bytes = None
+                    if image:
+                        try:
+                            # Limite de tamanho (ex: 10MB)
+                            if image.size > 10 * 1024 * 1024:
+                                errors.append("A imagem é muito grande (máximo 10MB).")
+                            else:
+                                img_bytes = image.read()
+                        except Exception as e:
+                            errors.append(f"Erro ao processar a imagem: {e}")
+                    
+                    if errors:
+                        for err in errors:
+                            st.error(f"❌ {err}")
+                    else:
+                        try:
+                            db.add_product(name.strip(), brand, style, type_, price, quantity, str(exp_date), img_bytes, sku=sku)
+                            st.success("✅ Produto cadastrado com sucesso!")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"❌ Erro ao salvar no banco de dados: {e}")
+
+    # Import/Export Section
+    with perf.section("produtos: importar/exportar"):
+        with st.expander("Importar / Exportar Dados"):
+            col_ie1, col_ie2 = st.columns(2)
+            
+            with col_ie1:
+                st.write("### Exportar")
+                if db.count_products() > 0:
+                    render_export_panel()
+                else:
+                    st.info("Sem dados para exportar.")
+
+            with col_ie2:
+                st.write("### Importar")
+                uploaded_csv = st.file_uploader("Arquivo CSV", type=['csv'], key="csv_up")
+                sync_mode = st.radio("Modo", ["Sincronizar", "Importar tudo"], horizontal=True, key="import_mode",
+                                     help="Sincronizar: casa pelo id ou SKU e grava só o que mudou. "
+                                          "Importar tudo: insere as linhas e sobrescreve produtos com o mesmo id.") == "Sincronizar"
+                if uploaded_csv:
+                    col_run, col_preview = st.columns(2)
+                    run = col_run.button("Processar Importação", key="btn_import")
+                    preview = sync_mode and col_preview.button("Pré-visualizar alterações", key="btn_import_preview")
+                    if run or preview:
+                        try:
+                            allowed_values = {'marca': utils.MARCAS, 'estilo': utils.ESTILOS, 'tipo': utils.TIPOS}
+                            progress_bar = st.progress(0.0)
                             
-                            progress_bar = st.progress(0)
-                            total_rows = len(imported_df)
+                            def update_progress(rows_done):
+                                # Tamanho total de linhas é desconhecido durante a leitura em blocos
+                                fraction = min(uploaded_csv.tell() / max(uploaded_csv.size, 1), 1.0)
+                                progress_bar.progress(fraction, text=f"{rows_done} linhas processadas")
                             
-                            for index, row in imported_df.iterrows():
-                                try:
-                                    p_name = str(row.get('nome', '')).strip()
-                                    if not p_name:
-                                        raise ValueError("Nome do produto vazio")
-                                    
-                                    p_brand = str(row.get('marca', 'Outra'))
-                                    # Opcional: validar se a marca está na lista permitida, senão usar 'Outra'
-                                    if p_brand not in utils.MARCAS: p_brand = 'Outra'
-                                        
-                                    p_style = str(row.get('estilo', 'Outro'))
-                                    if p_style not in utils.ESTILOS: p_style = 'Outro'
-                                        
-                                    p_type = str(row.get('tipo', 'Outro'))
-                                    if p_type not in utils.TIPOS: p_type = 'Outro'
-                                    
-                                    try:
-                                        p_price = float(row.get('preco', 0))
-                                        if p_price < 0: raise ValueError
-                                    except:
-                                        p_price = 0.0
-                                        
-                                    try:
-                                        p_qty = int(row.get('quantidade', 0))
-                                        if p_qty < 0: raise ValueError
-                                    except:
-                                        p_qty = 0
-                                        
-                                    p_exp = str(row.get('data_validade', ''))
-                                    
-                                    # Tentar obter o ID se existir
-                                    p_id = row.get('id', None)
-                                    if pd.notna(p_id):
-                                        try:
-                                            p_id = int(p_id)
-                                        except:
-                                            p_id = None
-                                    else:
-                                        p_id = None
-                                    
-                                    db.add_product(
-                                        p_name,
-                                        p_brand,
-                                        p_style,
-                                        p_type,
-                                        p_price,
-                                        p_qty,
-                                        p_exp,
-                                        None, # Imagem via CSV não suportada facilmente
-                                        id=p_id
-                                    )
-                                    success_count += 1
-                                    
-                                except Exception as e_row:
-                                    fail_count += 1
-                                    error_log.append(f"Linha {index + 2}: {p_name if 'p_name' in locals() else 'Desconhecido'} - {e_row}")
-                                
-                                # Update progress
-                                progress_bar.progress((index + 1) / total_rows)
+                            # Separador detectado automaticamente; gravação em lotes transacionais
+                            uploaded_csv.seek(0)
+                            if sync_mode:
+                                report = db.sync_products_csv(uploaded_csv, allowed_values, dry_run=bool(preview),
+                                                              progress=update_progress)
+                                report['imported'] = report['inserted'] + report['updated']
+                            else:
+                                report = db.import_products_csv(uploaded_csv, allowed_values, progress=update_progress)
+                            progress_bar.progress(1.0)
                             
                             st.divider()
-                            if success_count > 0:
-                                st.success(f"✅ {success_count} produtos importados com sucesso!")
+                            if sync_mode:
+                                verb = "seriam" if preview else "foram"
+                                st.info(f"{'Pré-visualização: ' if preview else ''}{report['inserted']} produtos {verb} inseridos, "
+                                        f"{report['updated']} atualizados e {report['unchanged']} estão inalterados.")
+                                if report['changes']:
+                                    changes = pd.DataFrame(report['changes'], columns=['Linha', 'ID', 'Nome', 'Ação', 'Alterações'])
+                                    st.dataframe(changes, hide_index=True)
+                                    if len(report['changes']) < report['imported']:
+                                        st.caption(f"Mostrando as primeiras {len(report['changes'])} alterações.")
+                            elif report['imported'] > 0:
+                                st.success(f"✅ {report['imported']} produtos importados com sucesso!")
                             
-                            if fail_count > 0:
-                                st.warning(f"⚠️ {fail_count} falhas na importação.")
+                            if report['failed'] > 0:
+                                st.warning(f"⚠️ {report['failed']} falhas na importação.")
                                 with st.expander("Ver Detalhes dos Erros"):
-                                    for err in error_log:
-                                        st.write(err)
+                                    for line, p_name, err in report['errors']:
+                                        st.write(f"Linha {line}: {p_name} - {err}")
                             
-                            if success_count > 0:
+                            if report['imported'] > 0 and not preview:
                                 st.button("Atualizar Lista", on_click=st.rerun)
-
-                    except Exception as e:
-                        st.error(f"❌ Erro crítico ao ler o arquivo CSV: {e}")
+                        
+                        except ValueError as e:
+                            st.error(f"❌ {e}")
+                        except Exception as e:
+                            st.error(f"❌ Erro crítico ao ler o arquivo CSV: {e}")
     
     
     # List/Edit/Delete
     st.subheader("Lista de Produtos")
-    products_df = db.get_products()
     
     # Filters
-    filter_text = st.text_input("Buscar Produto", key="search_prod")
-    if not products_df.empty:
-        if filter_text:
-            products_df = products_df[products_df['name'].str.contains(filter_text, case=False, na=False) | 
-                                      products_df['brand'].str.contains(filter_text, case=False, na=False)]
-        
-        # Grid Layout with Images and Actions
-        cols_per_row = 3
-        rows = len(products_df)
-        
-        for i in range(0, rows, cols_per_row):
-            cols = st.columns(cols_per_row)
-            for j in range(cols_per_row):
-                if i + j < rows:
-                    row = products_df.iloc[i + j]
-                    with cols[j]:
-                        with st.container(border=True):
-                            # Image
-                            img_src = utils.get_product_image_source(row)
-                            if img_src:
-                                st.image(img_src, use_container_width=True)
-                            else:
-                                st.markdown("*Sem Imagem*")
-                                
-                            st.markdown(f"**{row['name']}**")
-                            st.caption(f"{row['brand']} | {row['style']}")
-                            st.markdown(f"**Preço:** R$ {row['price']:.2f}")
-                            st.markdown(f"**Validade:** {row['expiration_date']}")
-                            st.markdown(f"**Estoque:** {row['quantity']}")
-                            
-                            # Actions Expander
-                            with st.expander("Gerenciar"):
-                                # Sale
-                                st.markdown("##### Vender")
-                                if row['quantity'] > 0:
-                                    sell_qty = st.number_input("Qtd", min_value=1, max_value=int(row['quantity']), key=f"sell_qty_{row['id']}")
-                                    if st.button("Vender", key=f"btn_sell_{row['id']}"):
-                                        user_id = st.session_state['user'][0] if 'user' in st.session_state and st.session_state['user'] else None
-                                        success, msg = db.register_sale(int(row['id']), sell_qty, user_id)
-                                        if success:
-                                            st.toast(msg, icon="✅")
-                                            st.rerun()
-                                        else:
-                                            st.toast(msg, icon="❌")
-                                else:
-                                    st.warning("Esgotado")
-                                
-                                st.divider()
-                                
-                                # Edit Trigger (Store ID in session to open modal/form elsewhere or inline)
-                                # Inline editing in a grid is complex. Let's use a dialog or stick to the form below.
-                                # For simplicity and robustness, we can use a button to load the 'Edit Form' at the top or a dialog.
-                                # Streamlit 1.23+ has st.experimental_dialog (now st.dialog). Assuming recent version.
-                                # If not, we fall back to session state loading.
-                                
-                                if st.button("Editar / Excluir", key=f"btn_edit_{row['id']}"):
-                                    st.session_state['edit_prod_id'] = int(row['id'])
-                                    st.rerun()
+    with perf.section("produtos: lista"):
+        filter_text = st.text_input("Buscar Produto", key="search_prod")
+        total_products = db.count_products(filter_text)
+        if total_products > 0:
+            page, page_size = render_pagination("prod_grid", total_products)
+            products_df = db.get_products_page(page, page_size, filter_text)
+            
+            # Grid Layout with Images and Actions
+            cols_per_row = 3
+            rows = len(products_df)
+            
+            for i in range(0, rows, cols_per_row):
+                cols = st.columns(cols_per_row)
+                for j in range(cols_per_row):
+                    if i + j < rows:
+                        row = products_df.iloc[i + j]
+                        with cols[j]:
+                            render_product_card(row)
 
     # Edit Modal/Section
-    if 'edit_prod_id' in st.session_state:
-        prod_id = st.session_state['edit_prod_id']
-        action_prod = db.get_product_by_id(prod_id)
-        if action_prod:
-            with st.form(f"edit_prod_form_{prod_id}"):
-                st.subheader(f"Editando: {action_prod[1]}")
-                e_name = st.text_input("Nome", value=action_prod[1])
-                
-                try: b_idx = utils.MARCAS.index(action_prod[2])
-                except: b_idx = 0
-                e_brand = st.selectbox("Marca", utils.MARCAS, index=b_idx)
-                
-                try: s_idx = utils.ESTILOS.index(action_prod[3])
-                except: s_idx = 0
-                e_style = st.selectbox("Estilo", utils.ESTILOS, index=s_idx)
-                
-                try: t_idx = utils.TIPOS.index(action_prod[4])
-                except: t_idx = 0
-                e_type = st.selectbox("Tipo", utils.TIPOS, index=t_idx)
-                
-                try: e_price_val = float(action_prod[5])
-                except: e_price_val = 0.0
-                e_price = st.number_input("Preço", value=e_price_val, min_value=0.01)
-                
-                try: e_qty_val = int(action_prod[6])
-                except: e_qty_val = 0
-                e_qty = st.number_input("Qtd", value=e_qty_val, min_value=0, step=1)
-                
-                # Safe date parsing
-                default_date = datetime.date.today()
-                if action_prod[7]:
-                    try:
-                        default_date = datetime.datetime.strptime(str(action_prod[7]), "%Y-%m-%d").date()
-                    except:
-                        try:
-                             # Try fallback format if different
-                             default_date = datetime.datetime.strptime(str(action_prod[7]), "%d/%m/%Y").date()
-                        except:
-                            pass
-                e_exp_date = st.date_input("Vencimento", value=default_date)
-                
-                e_image = st.file_uploader("Nova Imagem", type=['png', 'jpg', 'jpeg'])
-                
-                col_save, col_del, col_close = st.columns(3)
-                
-                with col_save:
-                    if st.form_submit_button("Salvar"):
-                        try:
-                            img_bytes = action_prod[8]
-                            if e_image:
-                                img_bytes = e_image.read()
-                            
-                            db.update_product(prod_id, e_name, e_brand, e_style, e_type, e_price, e_qty, str(e_exp_date), img_bytes)
-                            st.success("Produto atualizado!")
-                            if 'edit_prod_id' in st.session_state: del st.session_state['edit_prod_id']
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Erro ao atualizar: {e}")
-                
-                with col_del:
-                    if st.form_submit_button("EXCLUIR", type="primary"):
-                        try:
-                            db.delete_product(prod_id)
-                            st.success("Produto excluído.")
-                            if 'edit_prod_id' in st.session_state: del st.session_state['edit_prod_id']
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Erro ao excluir: {e}")
-                        
-                with col_close:
-                    if st.form_submit_button("Cancelar"):
-                        if 'edit_prod_id' in st.session_state: del st.session_state['edit_prod_id']
-                        st.rerun()
-        else:
-             if 'edit_prod_id' in st.session_state: del st.session_state['edit_prod_id']
-             st.rerun()
+    with perf.section("produtos: edição"):
+        render_edit_form()
@@ -1,54 +1,129 @@
 import streamlit as st
 import database as db
 import views.components as components
+import perf
 
+def add_to_cart(cart, product_id, name, price, stock, quantity):
+    """Soma ao item já existente no carrinho; não deixa passar do estoque."""
+    product_id = int(product_id)
+    item = next((item for item in cart if item['id'] == product_id), None)
+    in_cart = item['quantity'] if item else 0
+    if in_cart + quantity > stock:
+        return False, f"Estoque insuficiente para {name} (disponível: {stock - in_cart})."
+    if item:
+        item['quantity'] += quantity
+    else:
+        cart.append({'id': product_id, 'name': name, 'price': float(price), 'quantity': quantity})
+    return True, f"{quantity} x {name} adicionado ao carrinho."
+
+def render_cart(cart, user):
+    st.subheader("Carrinho")
+    if not cart:
+        st.caption("Carrinho vazio.")
+        return
+    
+    for i, item in enumerate(cart):
+        col_name, col_qty, col_total, col_remove = st.columns([3, 1, 1, 1])
+        col_name.write(item['name'])
+        col_qty.write(f"{item['quantity']} x R$ {item['price']:.2f}")
+        col_total.write(f"R$ {item['quantity'] * item['price']:.2f}")
+        if col_remove.button("Remover", key=f"cart_remove_{i}"):
+            cart.pop(i)
+            st.rerun()
+    
+    total = sum(item['quantity'] * item['price'] for item in cart)
+    st.write(f"### Total a Pagar: R$ {total:.2f}")
+    
+    col_confirm, col_clear = st.columns(2)
+    if col_confirm.button("Confirmar Venda", type="primary"):
+        success, msg, results = db.register_sales_batch([(item['id'], item['quantity']) for item in cart], user.id)
+        if success:
+            cart.clear()
+            st.balloons()
+            st.success(msg)
+            st.rerun()
+        else:
+            st.error(msg)
+            names = {item['id']: item['name'] for item in cart}
+            for result in results:
+                if not result['ok']:
+                    st.write(f"❌ {names.get(result['product_id'], result['product_id'])}: {result['message']}")
+    if col_clear.button("Esvaziar Carrinho"):
+        cart.clear()
+        st.rerun()
+
+@perf.timed(kind='view')
 def show_employee_view(user):
-    st.title(f"Painel do Funcionário - {user[4]}")
+    st.title(f"Painel do Funcionário - {user.name}")
     
     tab1, tab2 = st.tabs(["Vendas (PDV)", "Gerenciar Estoque"])
     
     with tab1:
         st.header("Ponto de Venda")
+        cart = st.session_state.setdefault('pdv_cart', [])
         
-        products = db.get_products()
-        if not products.empty:
-            product_options = {f"{row['id']} - {row['name']} (Estoque: {row['quantity']})": row['id'] for index, row in products.iterrows() if row['quantity'] > 0}
+        if db.count_products() == 0:
+            st.warning("Sem produtos cadastrados.")
+        else:
+            # Leitor de código de barras: o código é digitado/lido e o Enter envia o formulário
+            with perf.section("pdv: leitor de código"):
+                with st.form("pdv_scan_form", clear_on_submit=True):
+                    col_code, col_scan_qty = st.columns([3, 1])
+                    code = col_code.text_input("Código (SKU / código de barras)")
+                    scan_qty = col_scan_qty.number_input("Qtd", min_value=1, step=1, value=1)
+                    if st.form_submit_button("Adicionar pelo Código"):
+                        prod = db.get_product_by_sku(code)
+                        if prod:
+                            ok, msg = add_to_cart(cart, prod[0], prod[2], prod[3], prod[4], int(scan_qty))
+                            if ok:
+                                st.toast(msg, icon="🛒")
+                            else:
+                                st.error(msg)
+                        else:
+                            st.error("Código não encontrado.")
             
-            if product_options:
-                selected_option = st.selectbox("Selecione o Produto", list(product_options.keys()))
-                selected_id = product_options[selected_option]
-                
-                prod = db.get_product_by_id(selected_id)
-                
-                col1, col2 = st.columns([1, 2])
-                with col1:
-                    if prod[8]: # image
-                        st.image(prod[8], caption=prod[1], use_container_width=True)
+            # Busca por nome ou início do código
+            with perf.section("pdv: busca"):
+                search = st.text_input("Buscar produto (nome ou código)", key="pdv_search")
+                if search:
+                    matches = db.search_pos_products(search)
+                    if matches.empty:
+                        st.warning("Nenhum produto com estoque disponível.")
                     else:
-                        st.info("Sem imagem disponível")
-                
-                with col2:
-                    st.write(f"**Produto:** {prod[1]}")
-                    st.write(f"**Preço Unitário:** R$ {prod[5]:.2f}")
-                    
-                    max_qty = int(prod[6])
-                    qty_sell = st.number_input("Quantidade", min_value=1, max_value=max_qty, step=1)
-                    
-                    total = qty_sell * prod[5]
-                    st.write(f"### Total a Pagar: R$ {total:.2f}")
-                    
-                    if st.button("Confirmar Venda", type="primary"):
-                        success, msg = db.register_sale(selected_id, qty_sell, user[0])
-                        if success:
-                            st.balloons()
-                            st.success(msg)
-                            st.rerun()
-                        else:
-                            st.error(msg)
-            else:
-                st.warning("Nenhum produto com estoque disponível.")
-        else:
-            st.warning("Sem produtos cadastrados.")
+                        options = {f"{row.id} - {row.name} (Estoque: {row.quantity})": row for row in matches.itertuples(index=False)}
+                        selected_option = st.selectbox("Selecione o Produto", list(options.keys()))
+                        prod = options[selected_option]
+                        selected_id = int(prod.id)
+                        
+                        col1, col2 = st.columns([1, 2])
+                        with col1:
+                            prod_image = db.get_product_image(selected_id)
+                            if prod_image:
+                                st.image(prod_image, caption=prod.name, use_container_width=True)
+                            else:
+                                st.info("Sem imagem disponível")
+                        
+                        with col2:
+                            st.write(f"**Produto:** {prod.name}")
+                            if isinstance(prod.sku, str):
+                                st.write(f"**Código:** {prod.sku}")
+                            st.write(f"**Preço Unitário:** R$ {prod.price:.2f}")
+                            
+                            # Desconta o que já está no carrinho
+                            in_cart = sum(item['quantity'] for item in cart if item['id'] == selected_id)
+                            max_qty = int(prod.quantity) - in_cart
+                            if max_qty > 0:
+                                qty_sell = st.number_input("Quantidade", min_value=1, max_value=max_qty, step=1)
+                                st.write(f"Subtotal: R$ {qty_sell * prod.price:.2f}")
+                                
+                                if st.button("Adicionar ao Carrinho"):
+                                    add_to_cart(cart, selected_id, prod.name, prod.price, prod.quantity, int(qty_sell))
+                                    st.rerun()
+                            else:
+                                st.info("Todo o estoque deste produto já está no carrinho.")
+        
+        with perf.section("pdv: carrinho"):
+            render_cart(cart, user)
 
     with tab2:
         components.render_product_management()